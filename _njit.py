@@ -0,0 +1,18 @@
+"""Optional Numba support.
+
+Hot loops are decorated with ``njit`` imported from here. When numba is not
+installed the decorator is a no-op and the kernels run as plain Python, so
+the backtester still works (just slower).
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -1,34 +1,77 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # plots are only ever saved to files, never shown
 import matplotlib.pyplot as plt
-from datetime import datetime
+import matplotlib.dates as mdates
+
+from _njit import njit
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+# Print extra diagnostics (e.g. plotted series ranges) while plotting
+DEBUG = False
+
+# Series longer than this use numexpr (when installed) for the metric arithmetic;
+# below it numexpr's fixed call overhead outweighs the single-pass evaluation
+NUMEXPR_MIN_SIZE = 50_000
+
+# Intraday intervals recognised in plot labels and their bars per hour
+_INTERVALS_PER_HOUR = {'1m': 60, '2m': 30, '5m': 12, '15m': 4, '30m': 2, '1h': 1}
+_INTERVAL_RE = re.compile(r'(?<![0-9])(1m|2m|5m|15m|30m|1h)(?![0-9a-z])')
+
+# Full-period plots of longer series are min/max decimated into this many bins
+PLOT_MAX_POINTS = 10_000
+PLOT_DECIMATE_BINS = 4000
+
+# Transaction logs longer than this are summarized by the compiled kernel;
+# shorter ones are not worth its first-call compile time
+SUMMARIZE_JIT_MIN = 5000
 
 def calculate_performance_metrics(portfolio_values, trading_days_per_year=252):
-    """Calculate performance metrics for a portfolio"""
-    # Ensure we have a Series, not DataFrame
-    if isinstance(portfolio_values, pd.DataFrame):
-        portfolio_values = portfolio_values.iloc[:, 0]
+    """
+    Calculate performance metrics for a portfolio
     
-    returns = portfolio_values.pct_change().dropna()
+    portfolio_values can be anything array-like (pandas or polars Series,
+    NumPy array); for a frame or 2-D array the first column is used.
+    """
+    # Work on the raw values; pandas Series ops here only add index overhead
+    values = np.asarray(portfolio_values, dtype=np.float64)
+    if values.ndim == 2:
+        values = values[:, 0]
+    use_numexpr = ne is not None and values.size > NUMEXPR_MIN_SIZE
+    prev_values, next_values = values[:-1], values[1:]
+    if use_numexpr:
+        returns = ne.evaluate('(next_values - prev_values) / prev_values')
+    else:
+        returns = (next_values - prev_values) / prev_values
+    returns = returns[~np.isnan(returns)]
     
     # CAGR (Compound Annual Growth Rate)
-    start_value = portfolio_values.iloc[0]
-    end_value = portfolio_values.iloc[-1]
-    num_years = len(portfolio_values) / trading_days_per_year
+    start_value = values[0]
+    end_value = values[-1]
+    num_years = len(values) / trading_days_per_year
     cagr = (end_value / start_value) ** (1 / num_years) - 1
     
     # Sharpe Ratio (assuming risk-free rate of 0 for simplicity)
-    mean_return = returns.mean()
-    std_dev = returns.std()
+    mean_return = returns.mean() if returns.size > 0 else np.nan
+    std_dev = returns.std(ddof=1) if returns.size > 1 else np.nan
     
     if pd.notna(std_dev) and std_dev > 0:
         sharpe_ratio = mean_return / std_dev * np.sqrt(trading_days_per_year)
     else:
         sharpe_ratio = 0
     
-    # Maximum Drawdown
-    cumulative = portfolio_values / portfolio_values.cummax()
-    max_drawdown = (cumulative.min() - 1) * 100
+    # Maximum Drawdown (running peak ignores NaN like Series.cummax)
+    peaks = np.fmax.accumulate(values)
+    cumulative = ne.evaluate('values / peaks') if use_numexpr else values / peaks
+    max_drawdown = (np.nanmin(cumulative) - 1) * 100
     
     return {
         'CAGR': cagr * 100,  # Convert to percentage
@@ -36,297 +79,314 @@ def calculate_performance_metrics(portfolio_values, trading_days_per_year=252):
         'Max_Drawdown': max_drawdown
     }
 
-def backtest_strategy(df, signals, initial_capital=10000.0, log_transactions=True,
-                     stop_loss_pct=None, take_profit_pct=None, 
-                     use_trailing_stop=False, trailing_stop_pct=None,
-                     enable_shorting=True, dedup_window_minutes=5, spread_pct=0.001):
+# Transaction action codes used by the simulation kernel; ACTIONS[code] is the
+# label written to the transaction log. Risk management exits come last.
+ACTIONS = (
+    'BUY', 'SELL', 'SHORT', 'COVER', 'EXIT_LONG', 'EXIT_SHORT',
+    'STOP_LOSS_LONG', 'STOP_LOSS_SHORT',
+    'TAKE_PROFIT_LONG', 'TAKE_PROFIT_SHORT',
+    'TRAILING_STOP_LONG', 'TRAILING_STOP_SHORT',
+)
+BUY, SELL, SHORT, COVER, EXIT_LONG, EXIT_SHORT = range(6)
+STOP_LOSS, TAKE_PROFIT, TRAILING_STOP = 6, 8, 10  # + 0 for long, + 1 for short
+N_ACTIONS = len(ACTIONS)
+
+# Signal transitions handled by the kernel, keyed as
+# 3 * (new signal + 1) + (position side + 1) with signal/side in {-1, 0, 1}
+TO_SHORT_FROM_FLAT, TO_SHORT_FROM_LONG = 1, 2
+TO_FLAT_FROM_SHORT, TO_FLAT_FROM_LONG = 3, 5
+TO_LONG_FROM_SHORT, TO_LONG_FROM_FLAT = 6, 7
+
+@njit(cache=True)
+def _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+    """Check if a transaction should be allowed based on deduplication window"""
+    return (not has_last_transaction) or (now_ns - last_transaction_ns) >= dedup_ns
+
+@njit(cache=True)
+def _first_risk_exit(prices, start, stop, position_type, entry_price, stop_loss_pct, take_profit_pct):
+    """First bar in [start, stop) where the fixed stop loss or take profit triggers, else stop"""
+    if position_type == 0 or np.isnan(entry_price):
+        return stop
+    for j in range(start, stop):
+        if position_type == 1:
+            position_return = (prices[j] - entry_price) / entry_price
+        else:
+            position_return = (entry_price - prices[j]) / entry_price
+        if stop_loss_pct != 0.0 and position_return <= -stop_loss_pct:
+            return j
+        if take_profit_pct != 0.0 and position_return >= take_profit_pct:
+            return j
+    return stop
+
+@njit(cache=True)
+def _fill_unchanged(cash_out, shares_out, total_out, prices, start, stop, cash, shares, entry_price):
+    """Record bars [start, stop) over which the cash and share holdings stay the same"""
+    cash_out[start:stop] = cash
+    shares_out[start:stop] = shares
+    if shares > 0:
+        total_out[start:stop] = cash + shares * prices[start:stop]
+    elif shares < 0 and not np.isnan(entry_price):
+        total_out[start:stop] = cash + (entry_price - prices[start:stop]) * abs(shares)
+    else:
+        total_out[start:stop] = cash
+
+@njit(cache=True)
+def _simulate(prices, sigs, change_idx, dates_ns, initial_capital, stop_loss_pct,
+              take_profit_pct, use_trailing_stop, trailing_stop_pct, enable_shorting,
+              dedup_ns, spread_pct, log_transactions):
     """
-    Enhanced backtest with stop-loss, take-profit, and shorting functionality
-    
-    Args:
-        df: Price data DataFrame
-        signals: Trading signals DataFrame
-        initial_capital: Starting capital
-        log_transactions: Whether to log transactions
-        stop_loss_pct: Stop loss percentage (e.g., 0.05 for 5%)
-        take_profit_pct: Take profit percentage (e.g., 0.10 for 10%)
-        use_trailing_stop: Enable trailing stop loss
-        trailing_stop_pct: Trailing stop percentage
-        enable_shorting: Enable short selling functionality
-        dedup_window_minutes: Time window in minutes to prevent duplicate transactions
-        spread_pct: Bid-ask spread percentage (e.g., 0.001 for 0.1%)
+    Bar-by-bar trading state machine behind backtest_strategy.
+
+    change_idx holds the (sorted) bars whose signal differs from the previous
+    bar; unless a trailing stop is being tracked, the loop jumps straight to
+    the next change (or the next stop/target hit) instead of stepping bars.
+    Disabled risk thresholds are passed as 0.0. Returns per-bar cash, shares and
+    total value, plus transaction columns (bar index, action code, price, shares,
+    PnL, return %, portfolio value) of which the first n_tx entries are filled.
     """
+    n = len(prices)
+    cash_out = np.empty(n)
+    shares_out = np.empty(n)
+    total_out = np.empty(n)
+    
+    # At most two transactions per bar (exit + re-entry)
+    tx_idx = np.empty(2 * n, dtype=np.int64)
+    tx_action = np.empty(2 * n, dtype=np.int8)
+    tx_price = np.empty(2 * n)
+    tx_shares = np.empty(2 * n)
+    tx_pnl = np.empty(2 * n)
+    tx_return = np.empty(2 * n)
+    tx_value = np.empty(2 * n)
+    n_tx = 0
+    
     cash = initial_capital
     shares = 0.0  # Positive for long positions, negative for short positions
-    portfolio = pd.DataFrame(index=df.index)
-    portfolio['cash'] = cash
-    portfolio['shares'] = shares
-    portfolio['total'] = cash
-    
-    transactions = []
     
     # Deduplication tracking - prevent duplicate transactions within time window
-    last_transaction_time = None
-    last_transaction_type = None
-    dedup_window = pd.Timedelta(minutes=dedup_window_minutes)
-    
-    # Risk management tracking
-    position_entry_price = None
-    position_entry_date = None
-    trailing_stop_price = None
-    position_type = None  # 'long' or 'short'
-    
-    price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
-    
-    def should_allow_transaction(action_type, current_time):
-        """Check if a transaction should be allowed based on deduplication window"""
-        nonlocal last_transaction_time, last_transaction_type
-        
-        # Always allow risk management exits (stop loss, take profit, trailing stop)
-        if any(risk_action in action_type for risk_action in ['STOP_LOSS', 'TAKE_PROFIT', 'TRAILING_STOP']):
-            return True
-            
-        # Allow transaction if no previous transaction or enough time has passed
-        if last_transaction_time is None or (current_time - last_transaction_time) >= dedup_window:
-            return True
-            
-        # Block ANY transaction type if within the deduplication window
-        return False
-    
-    def record_transaction(action_type, current_time):
-        """Record the transaction time and type for deduplication"""
-        nonlocal last_transaction_time, last_transaction_type
-        last_transaction_time = current_time
-        last_transaction_type = action_type
-
-    def get_transaction_price(mid_price, action_type, spread_pct):
-        """Calculate actual transaction price considering bid-ask spread"""
-        spread = mid_price * spread_pct
-        
-        if action_type in ['BUY', 'COVER']:
-            # Buying: pay ask price (mid + spread/2)
-            return mid_price * (1 + spread_pct / 2)
-        elif action_type in ['SELL', 'SHORT']:
-            # Selling: receive bid price (mid - spread/2)
-            return mid_price * (1 - spread_pct / 2)
-        else:
-            # Risk management exits: use mid price
-            return mid_price
-
-    for i, (date, row) in enumerate(df.iterrows()):
-        current_price = row[price_col]
-        current_signal = signals.iloc[i]['signal']
-        prev_signal = signals.iloc[i-1]['signal'] if i > 0 else 0.0
+    has_last_transaction = False
+    last_transaction_ns = 0
+    
+    # Risk management tracking (NaN when not set)
+    position_entry_price = np.nan
+    trailing_stop_price = np.nan
+    position_type = 0  # 1 long, -1 short, 0 none
+    
+    # Bid-ask spread: buying pays mid + spread/2, selling receives mid - spread/2
+    ask_mult = 1 + spread_pct / 2
+    bid_mult = 1 - spread_pct / 2
+    
+    # Whether any stop/target can close a position between signal changes
+    trailing_active = use_trailing_stop and trailing_stop_pct != 0.0
+    risk_managed = stop_loss_pct != 0.0 or take_profit_pct != 0.0 or trailing_active
+    
+    prev_signal = 0.0
+    k = 0  # cursor into change_idx
+    i = 0
+    while i < n:
+        current_price = prices[i]
+        current_signal = sigs[i]
+        now_ns = dates_ns[i]
         
         # Risk management checks for existing positions
-        if shares != 0 and position_entry_price is not None:
+        if risk_managed and shares != 0 and not np.isnan(position_entry_price):
             should_exit = False
-            exit_reason = ""
+            exit_code = 0
             exit_price = current_price
             
-            if position_type == 'long':
+            if position_type == 1:
                 # Long position risk management
                 position_return = (current_price - position_entry_price) / position_entry_price
                 
                 # Stop loss check
-                if stop_loss_pct and position_return <= -stop_loss_pct:
+                if stop_loss_pct != 0.0 and position_return <= -stop_loss_pct:
                     should_exit = True
-                    exit_reason = "STOP_LOSS"
+                    exit_code = STOP_LOSS
                     exit_price = position_entry_price * (1 - stop_loss_pct)
                 
                 # Take profit check
-                elif take_profit_pct and position_return >= take_profit_pct:
+                elif take_profit_pct != 0.0 and position_return >= take_profit_pct:
                     should_exit = True
-                    exit_reason = "TAKE_PROFIT"
+                    exit_code = TAKE_PROFIT
                     exit_price = position_entry_price * (1 + take_profit_pct)
                 
                 # Trailing stop logic for long positions
-                elif use_trailing_stop and trailing_stop_pct:
-                    if trailing_stop_price is None:
-                        trailing_stop_price = current_price * (1 - trailing_stop_pct)
-                    else:
-                        # Update trailing stop if price moved favorably (upward)
-                        new_trailing_stop = current_price * (1 - trailing_stop_pct)
-                        if new_trailing_stop > trailing_stop_price:
-                            trailing_stop_price = new_trailing_stop
+                elif use_trailing_stop and trailing_stop_pct != 0.0:
+                    # Update trailing stop if price moved favorably (upward)
+                    new_trailing_stop = current_price * (1 - trailing_stop_pct)
+                    if np.isnan(trailing_stop_price) or new_trailing_stop > trailing_stop_price:
+                        trailing_stop_price = new_trailing_stop
                     
                     # Check if trailing stop was hit
                     if current_price <= trailing_stop_price:
                         should_exit = True
-                        exit_reason = "TRAILING_STOP"
+                        exit_code = TRAILING_STOP
                         exit_price = trailing_stop_price
                         
-            elif position_type == 'short':
+            elif position_type == -1:
                 # Short position risk management (inverse logic)
                 position_return = (position_entry_price - current_price) / position_entry_price
                 
                 # Stop loss check for short (price goes up)
-                if stop_loss_pct and position_return <= -stop_loss_pct:
+                if stop_loss_pct != 0.0 and position_return <= -stop_loss_pct:
                     should_exit = True
-                    exit_reason = "STOP_LOSS"
+                    exit_code = STOP_LOSS + 1
                     exit_price = position_entry_price * (1 + stop_loss_pct)
                 
                 # Take profit check for short (price goes down)
-                elif take_profit_pct and position_return >= take_profit_pct:
+                elif take_profit_pct != 0.0 and position_return >= take_profit_pct:
                     should_exit = True
-                    exit_reason = "TAKE_PROFIT"
+                    exit_code = TAKE_PROFIT + 1
                     exit_price = position_entry_price * (1 - take_profit_pct)
                 
                 # Trailing stop logic for short positions
-                elif use_trailing_stop and trailing_stop_pct:
-                    if trailing_stop_price is None:
-                        trailing_stop_price = current_price * (1 + trailing_stop_pct)
-                    else:
-                        # Update trailing stop if price moved favorably (downward)
-                        new_trailing_stop = current_price * (1 + trailing_stop_pct)
-                        if new_trailing_stop < trailing_stop_price:
-                            trailing_stop_price = new_trailing_stop
+                elif use_trailing_stop and trailing_stop_pct != 0.0:
+                    # Update trailing stop if price moved favorably (downward)
+                    new_trailing_stop = current_price * (1 + trailing_stop_pct)
+                    if np.isnan(trailing_stop_price) or new_trailing_stop < trailing_stop_price:
+                        trailing_stop_price = new_trailing_stop
                     
                     # Check if trailing stop was hit
                     if current_price >= trailing_stop_price:
                         should_exit = True
-                        exit_reason = "TRAILING_STOP"
+                        exit_code = TRAILING_STOP + 1
                         exit_price = trailing_stop_price
             
             # Execute risk management exit
             if should_exit:
-                # Determine transaction price with spread adjustment
-                if position_type == 'long':
+                if position_type == 1:
                     # Selling long position
-                    transaction_price = get_transaction_price(exit_price, 'SELL', spread_pct)
+                    transaction_price = exit_price * bid_mult
                     pnl = (transaction_price - position_entry_price) * shares
                     cash += shares * transaction_price
-                elif position_type == 'short':
+                else:
                     # Covering short position
-                    transaction_price = get_transaction_price(exit_price, 'COVER', spread_pct)
+                    transaction_price = exit_price * ask_mult
                     pnl = (position_entry_price - transaction_price) * abs(shares)
                     cash += pnl  # Add the PnL to cash
                 
-                pnl_pct = pnl / (position_entry_price * abs(shares)) * 100
-                
                 if log_transactions:
-                    action = f"{exit_reason}_{position_type.upper()}"
-                    transactions.append({
-                        'Date': date,
-                        'Action': action,
-                        'Price': transaction_price,
-                        'Shares': abs(shares),
-                        'PnL': pnl,
-                        'Return': pnl_pct,
-                        'Portfolio_Value': cash
-                    })
-                    record_transaction(action, date)
+                    tx_idx[n_tx] = i
+                    tx_action[n_tx] = exit_code
+                    tx_price[n_tx] = transaction_price
+                    tx_shares[n_tx] = abs(shares)
+                    tx_pnl[n_tx] = pnl
+                    tx_return[n_tx] = pnl / (position_entry_price * abs(shares)) * 100
+                    tx_value[n_tx] = cash
+                    n_tx += 1
+                    has_last_transaction = True
+                    last_transaction_ns = now_ns
                 
                 shares = 0.0
-                position_entry_price = None
-                position_entry_date = None
-                trailing_stop_price = None
-                position_type = None
+                position_entry_price = np.nan
+                trailing_stop_price = np.nan
+                position_type = 0
         
-        # Regular signal-based trading
+        # Regular signal-based trading, dispatched on (new signal, position side)
         if current_signal != prev_signal:
-            if current_signal == 1.0 and shares == 0:  # Buy signal when not in position
-                if cash > 0 and should_allow_transaction('BUY', date):
-                    transaction_price = get_transaction_price(current_price, 'BUY', spread_pct)
+            if current_signal == 1.0 or current_signal == 0.0 or current_signal == -1.0:
+                side = 1 if shares > 0 else (-1 if shares < 0 else 0)
+                transition = 3 * (int(current_signal) + 1) + side + 1
+            else:
+                transition = -1
+            
+            if transition == TO_LONG_FROM_FLAT:  # Buy signal when not in position
+                if cash > 0 and _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                    transaction_price = current_price * ask_mult
                     new_shares = cash / transaction_price
                     
                     shares = new_shares
                     cash = 0.0
                     position_entry_price = transaction_price
-                    position_entry_date = date
-                    trailing_stop_price = None
-                    position_type = 'long'
+                    trailing_stop_price = np.nan
+                    position_type = 1
                     
                     if log_transactions:
-                        transactions.append({
-                            'Date': date,
-                            'Action': 'BUY',
-                            'Price': transaction_price,
-                            'Shares': new_shares,
-                            'PnL': 0.0,
-                            'Return': 0.0,
-                            'Portfolio_Value': shares * current_price
-                        })
-                        record_transaction('BUY', date)
+                        tx_idx[n_tx] = i
+                        tx_action[n_tx] = BUY
+                        tx_price[n_tx] = transaction_price
+                        tx_shares[n_tx] = new_shares
+                        tx_pnl[n_tx] = 0.0
+                        tx_return[n_tx] = 0.0
+                        tx_value[n_tx] = shares * current_price
+                        n_tx += 1
+                        has_last_transaction = True
+                        last_transaction_ns = now_ns
             
-            elif current_signal == -1.0 and shares > 0:  # Sell signal when in long position
-                if should_allow_transaction('SELL', date):
-                    transaction_price = get_transaction_price(current_price, 'SELL', spread_pct)
+            elif transition == TO_SHORT_FROM_LONG:  # Sell signal when in long position
+                if _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                    transaction_price = current_price * bid_mult
                     pnl = (transaction_price - position_entry_price) * shares
                     pnl_pct = (transaction_price - position_entry_price) / position_entry_price * 100
                     
                     cash = shares * transaction_price
                     
                     if log_transactions:
-                        transactions.append({
-                            'Date': date,
-                            'Action': 'SELL',
-                            'Price': transaction_price,
-                            'Shares': shares,
-                            'PnL': pnl,
-                            'Return': pnl_pct,
-                            'Portfolio_Value': cash
-                        })
-                        record_transaction('SELL', date)
+                        tx_idx[n_tx] = i
+                        tx_action[n_tx] = SELL
+                        tx_price[n_tx] = transaction_price
+                        tx_shares[n_tx] = shares
+                        tx_pnl[n_tx] = pnl
+                        tx_return[n_tx] = pnl_pct
+                        tx_value[n_tx] = cash
+                        n_tx += 1
+                        has_last_transaction = True
+                        last_transaction_ns = now_ns
                     
                     shares = 0.0
-                    position_entry_price = None
-                    position_entry_date = None
-                    trailing_stop_price = None
-                    position_type = None
+                    position_entry_price = np.nan
+                    trailing_stop_price = np.nan
+                    position_type = 0
                     
                     # If shorting is enabled, enter short position immediately
-                    if enable_shorting and cash > 0 and should_allow_transaction('SHORT', date):
-                        transaction_price = get_transaction_price(current_price, 'SHORT', spread_pct)
+                    if enable_shorting and cash > 0 and _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                        transaction_price = current_price * bid_mult
                         short_shares = cash / transaction_price
                         
                         shares = -short_shares  # Negative for short position
                         # For short positions, we keep the cash from the original sale
                         # and track the short position separately
                         position_entry_price = transaction_price
-                        position_entry_date = date
-                        trailing_stop_price = None
-                        position_type = 'short'
+                        trailing_stop_price = np.nan
+                        position_type = -1
                         
                         if log_transactions:
-                            transactions.append({
-                                'Date': date,
-                                'Action': 'SHORT',
-                                'Price': transaction_price,
-                                'Shares': short_shares,
-                                'PnL': 0.0,
-                                'Return': 0.0,
-                                'Portfolio_Value': cash
-                            })
-                            record_transaction('SHORT', date)
+                            tx_idx[n_tx] = i
+                            tx_action[n_tx] = SHORT
+                            tx_price[n_tx] = transaction_price
+                            tx_shares[n_tx] = short_shares
+                            tx_pnl[n_tx] = 0.0
+                            tx_return[n_tx] = 0.0
+                            tx_value[n_tx] = cash
+                            n_tx += 1
+                            has_last_transaction = True
+                            last_transaction_ns = now_ns
             
-            elif current_signal == -1.0 and shares == 0 and enable_shorting:  # Short signal when not in position
-                if cash > 0 and should_allow_transaction('SHORT', date):
-                    transaction_price = get_transaction_price(current_price, 'SHORT', spread_pct)
+            elif transition == TO_SHORT_FROM_FLAT:  # Short signal when not in position
+                if enable_shorting and cash > 0 and _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                    transaction_price = current_price * bid_mult
                     short_shares = cash / transaction_price
                     
                     shares = -short_shares  # Negative for short position
                     # For short positions, we keep the original cash
                     position_entry_price = transaction_price
-                    position_entry_date = date
-                    trailing_stop_price = None
-                    position_type = 'short'
+                    trailing_stop_price = np.nan
+                    position_type = -1
                     
                     if log_transactions:
-                        transactions.append({
-                            'Date': date,
-                            'Action': 'SHORT',
-                            'Price': transaction_price,
-                            'Shares': short_shares,
-                            'PnL': 0.0,
-                            'Return': 0.0,
-                            'Portfolio_Value': cash
-                        })
-                        record_transaction('SHORT', date)
+                        tx_idx[n_tx] = i
+                        tx_action[n_tx] = SHORT
+                        tx_price[n_tx] = transaction_price
+                        tx_shares[n_tx] = short_shares
+                        tx_pnl[n_tx] = 0.0
+                        tx_return[n_tx] = 0.0
+                        tx_value[n_tx] = cash
+                        n_tx += 1
+                        has_last_transaction = True
+                        last_transaction_ns = now_ns
             
-            elif current_signal == 1.0 and shares < 0:  # Buy signal when in short position (cover)
-                if should_allow_transaction('COVER', date):
-                    transaction_price = get_transaction_price(current_price, 'COVER', spread_pct)
+            elif transition == TO_LONG_FROM_SHORT:  # Buy signal when in short position (cover)
+                if _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                    transaction_price = current_price * ask_mult
                     pnl = (position_entry_price - transaction_price) * abs(shares)
                     pnl_pct = (position_entry_price - transaction_price) / position_entry_price * 100
                     
@@ -334,158 +394,305 @@ def backtest_strategy(df, signals, initial_capital=10000.0, log_transactions=Tru
                     cash = cash + pnl
                     
                     if log_transactions:
-                        transactions.append({
-                            'Date': date,
-                            'Action': 'COVER',
-                            'Price': transaction_price,
-                            'Shares': abs(shares),
-                            'PnL': pnl,
-                            'Return': pnl_pct,
-                            'Portfolio_Value': cash
-                        })
-                        record_transaction('COVER', date)
+                        tx_idx[n_tx] = i
+                        tx_action[n_tx] = COVER
+                        tx_price[n_tx] = transaction_price
+                        tx_shares[n_tx] = abs(shares)
+                        tx_pnl[n_tx] = pnl
+                        tx_return[n_tx] = pnl_pct
+                        tx_value[n_tx] = cash
+                        n_tx += 1
+                        has_last_transaction = True
+                        last_transaction_ns = now_ns
                     
                     shares = 0.0
-                    position_entry_price = None
-                    position_entry_date = None
-                    trailing_stop_price = None
-                    position_type = None
+                    position_entry_price = np.nan
+                    trailing_stop_price = np.nan
+                    position_type = 0
                     
                     # Enter long position immediately after covering
-                    if cash > 0 and should_allow_transaction('BUY', date):
-                        transaction_price = get_transaction_price(current_price, 'BUY', spread_pct)
+                    if cash > 0 and _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                        transaction_price = current_price * ask_mult
                         new_shares = cash / transaction_price
                         
                         shares = new_shares
                         cash = 0.0
                         position_entry_price = transaction_price
-                        position_entry_date = date
-                        trailing_stop_price = None
-                        position_type = 'long'
+                        trailing_stop_price = np.nan
+                        position_type = 1
                         
                         if log_transactions:
-                            transactions.append({
-                                'Date': date,
-                                'Action': 'BUY',
-                                'Price': transaction_price,
-                                'Shares': new_shares,
-                                'PnL': 0.0,
-                                'Return': 0.0,
-                                'Portfolio_Value': shares * current_price
-                            })
-                            record_transaction('BUY', date)
+                            tx_idx[n_tx] = i
+                            tx_action[n_tx] = BUY
+                            tx_price[n_tx] = transaction_price
+                            tx_shares[n_tx] = new_shares
+                            tx_pnl[n_tx] = 0.0
+                            tx_return[n_tx] = 0.0
+                            tx_value[n_tx] = shares * current_price
+                            n_tx += 1
+                            has_last_transaction = True
+                            last_transaction_ns = now_ns
             
-            elif current_signal == 0.0 and shares > 0:  # Exit signal when in long position
-                if should_allow_transaction('EXIT_LONG', date):
-                    transaction_price = get_transaction_price(current_price, 'SELL', spread_pct)
+            elif transition == TO_FLAT_FROM_LONG:  # Exit signal when in long position
+                if _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                    transaction_price = current_price * bid_mult
                     pnl = (transaction_price - position_entry_price) * shares
                     pnl_pct = (transaction_price - position_entry_price) / position_entry_price * 100
                     
                     cash = shares * transaction_price
                     
                     if log_transactions:
-                        transactions.append({
-                            'Date': date,
-                            'Action': 'EXIT_LONG',
-                            'Price': transaction_price,
-                            'Shares': shares,
-                            'PnL': pnl,
-                            'Return': pnl_pct,
-                            'Portfolio_Value': cash
-                        })
-                        record_transaction('EXIT_LONG', date)
+                        tx_idx[n_tx] = i
+                        tx_action[n_tx] = EXIT_LONG
+                        tx_price[n_tx] = transaction_price
+                        tx_shares[n_tx] = shares
+                        tx_pnl[n_tx] = pnl
+                        tx_return[n_tx] = pnl_pct
+                        tx_value[n_tx] = cash
+                        n_tx += 1
+                        has_last_transaction = True
+                        last_transaction_ns = now_ns
                     
                     shares = 0.0
-                    position_entry_price = None
-                    position_entry_date = None
-                    trailing_stop_price = None
-                    position_type = None
+                    position_entry_price = np.nan
+                    trailing_stop_price = np.nan
+                    position_type = 0
                 
-            elif current_signal == 0.0 and shares < 0:  # Exit signal when in short position
-                if should_allow_transaction('EXIT_SHORT', date):
-                    transaction_price = get_transaction_price(current_price, 'COVER', spread_pct)
+            elif transition == TO_FLAT_FROM_SHORT:  # Exit signal when in short position
+                if _allow_transaction(has_last_transaction, last_transaction_ns, now_ns, dedup_ns):
+                    transaction_price = current_price * ask_mult
                     pnl = (position_entry_price - transaction_price) * abs(shares)
                     pnl_pct = (position_entry_price - transaction_price) / position_entry_price * 100
                     
                     if log_transactions:
-                        transactions.append({
-                            'Date': date,
-                            'Action': 'EXIT_SHORT',
-                            'Price': transaction_price,
-                            'Shares': abs(shares),
-                            'PnL': pnl,
-                            'Return': pnl_pct,
-                            'Portfolio_Value': cash + pnl
-                        })
-                        record_transaction('EXIT_SHORT', date)
+                        tx_idx[n_tx] = i
+                        tx_action[n_tx] = EXIT_SHORT
+                        tx_price[n_tx] = transaction_price
+                        tx_shares[n_tx] = abs(shares)
+                        tx_pnl[n_tx] = pnl
+                        tx_return[n_tx] = pnl_pct
+                        tx_value[n_tx] = cash + pnl
+                        n_tx += 1
+                        has_last_transaction = True
+                        last_transaction_ns = now_ns
                     
                     # Update cash to reflect the PnL from the short position
                     cash = cash + pnl
                     shares = 0.0
-                    position_entry_price = None
-                    position_entry_date = None
-                    trailing_stop_price = None
-                    position_type = None
-                position_type = None
-        
-        # Update portfolio tracking
-        portfolio.loc[date, 'cash'] = float(cash)
-        portfolio.loc[date, 'shares'] = float(shares)
+                    position_entry_price = np.nan
+                    trailing_stop_price = np.nan
+                # Risk management is disabled for the position even if the
+                # exit was blocked by the dedup window
+                position_type = 0
         
         # Calculate total portfolio value
+        cash_out[i] = cash
+        shares_out[i] = shares
         if shares > 0:  # Long position
-            portfolio.loc[date, 'total'] = float(cash + shares * current_price)
-        elif shares < 0:  # Short position
+            total_out[i] = cash + shares * current_price
+        elif shares < 0 and not np.isnan(position_entry_price):  # Short position
             # For short positions: portfolio value = cash + unrealized P&L
             # Unrealized P&L = (entry_price - current_price) * number_of_shares
-            if position_entry_price is not None:
-                unrealized_pnl = (position_entry_price - current_price) * abs(shares)
-                portfolio.loc[date, 'total'] = float(cash + unrealized_pnl)
-            else:
-                portfolio.loc[date, 'total'] = float(cash)
+            total_out[i] = cash + (position_entry_price - current_price) * abs(shares)
         else:  # No position
-            portfolio.loc[date, 'total'] = float(cash)
+            total_out[i] = cash
+        
+        prev_signal = current_signal
+        
+        # Between signal changes nothing happens while flat or while holding
+        # without risk thresholds, and with only fixed stop/target levels a
+        # position can close no earlier than the first bar that hits one. Value
+        # the bars skipped in one go and jump ahead; a trailing stop moves
+        # every bar, so those positions step bar by bar.
+        if shares == 0 or not trailing_active:
+            while k < len(change_idx) and change_idx[k] <= i:
+                k += 1
+            next_i = change_idx[k] if k < len(change_idx) else n
+            if shares != 0 and risk_managed:
+                next_i = _first_risk_exit(prices, i + 1, next_i, position_type, position_entry_price,
+                                          stop_loss_pct, take_profit_pct)
+            _fill_unchanged(cash_out, shares_out, total_out, prices, i + 1, next_i,
+                            cash, shares, position_entry_price)
+            i = next_i
+        else:
+            i += 1
+    
+    return (cash_out, shares_out, total_out,
+            tx_idx, tx_action, tx_price, tx_shares, tx_pnl, tx_return, tx_value, n_tx)
+
+def backtest_strategy(df, signals, initial_capital=10000.0, log_transactions=True,
+                     stop_loss_pct=None, take_profit_pct=None, 
+                     use_trailing_stop=False, trailing_stop_pct=None,
+                     enable_shorting=True, dedup_window_minutes=5, spread_pct=0.001,
+                     log_path='transactions.txt'):
+    """
+    Enhanced backtest with stop-loss, take-profit, and shorting functionality
+    
+    Returns the portfolio DataFrame (cash, shares, total) and a transactions
+    DataFrame with columns Date, Action, Price, Shares, PnL, Return, Portfolio_Value
+    (Action is categorical over ACTIONS)
+    
+    Args:
+        df: Price data DataFrame
+        signals: Trading signals DataFrame, or a dict of arrays aligned with df
+                 (the generators' return_arrays=True output, which skips building a frame)
+        initial_capital: Starting capital
+        log_transactions: Whether to log transactions
+        stop_loss_pct: Stop loss percentage (e.g., 0.05 for 5%)
+        take_profit_pct: Take profit percentage (e.g., 0.10 for 10%)
+        use_trailing_stop: Enable trailing stop loss
+        trailing_stop_pct: Trailing stop percentage
+        enable_shorting: Enable short selling functionality
+        dedup_window_minutes: Time window in minutes to prevent duplicate transactions
+        spread_pct: Bid-ask spread percentage (e.g., 0.001 for 0.1%)
+        log_path: File the transaction log is written to; None records the
+                  transactions (and applies deduplication) without writing a file
+    """
+    price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+    
+    # Pull the columns the simulation needs out of pandas once
+    prices = df[price_col].to_numpy(dtype=np.float64)
+    sigs = np.asarray(signals['signal'], dtype=np.float64)
+    # Bars where the signal changes (the first bar is compared against flat)
+    change_idx = np.flatnonzero(np.diff(sigs, prepend=0.0) != 0)
+    dates_ns = df.index.as_unit('ns').asi8
+    dedup_ns = pd.Timedelta(minutes=dedup_window_minutes).value
+    
+    (cash_arr, shares_arr, total_arr,
+     tx_idx, tx_action, tx_price, tx_shares, tx_pnl, tx_return, tx_value, n_tx) = _simulate(
+        prices, sigs, change_idx, dates_ns, float(initial_capital),
+        float(stop_loss_pct or 0.0), float(take_profit_pct or 0.0),
+        bool(use_trailing_stop), float(trailing_stop_pct or 0.0),
+        bool(enable_shorting), dedup_ns, float(spread_pct), bool(log_transactions)
+    )
+    
+    portfolio = pd.DataFrame(
+        {'cash': cash_arr, 'shares': shares_arr, 'total': total_arr},
+        index=df.index
+    )
+    
+    # One row per transaction, built straight from the kernel's column arrays
+    transactions = pd.DataFrame({
+        'Date': df.index[tx_idx[:n_tx]],
+        'Action': pd.Categorical.from_codes(tx_action[:n_tx], categories=ACTIONS),
+        'Price': tx_price[:n_tx],
+        'Shares': tx_shares[:n_tx],
+        'PnL': tx_pnl[:n_tx],
+        'Return': tx_return[:n_tx],
+        'Portfolio_Value': tx_value[:n_tx]
+    })
     
     # Log transactions to file
-    if log_transactions and transactions:
-        with open('transactions.txt', 'w') as f:
-            f.write("Date,Action,Price,Shares,PnL,Return%,Portfolio_Value\n")
-            for t in transactions:
-                f.write(f"{t['Date']:%Y-%m-%d %H:%M:%S},{t['Action']},{t['Price']:.2f},"
-                       f"{t['Shares']:.6f},{t['PnL']:.2f},{t['Return']:.2f},{t['Portfolio_Value']:.2f}\n")
+    if log_transactions and log_path is not None and not transactions.empty:
+        # Format every row up front and write the file in one call
+        lines = [
+            f"{date},{action},{price:.2f},{shares:.6f},{pnl:.2f},{ret:.2f},{value:.2f}\n"
+            for date, action, price, shares, pnl, ret, value in zip(
+                transactions['Date'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                transactions['Action'],
+                tx_price[:n_tx].tolist(), tx_shares[:n_tx].tolist(), tx_pnl[:n_tx].tolist(),
+                tx_return[:n_tx].tolist(), tx_value[:n_tx].tolist()
+            )
+        ]
+        with open(log_path, 'w') as f:
+            f.write("Date,Action,Price,Shares,PnL,Return%,Portfolio_Value\n" + ''.join(lines))
     
     return portfolio, transactions
 
-def plot_portfolio(portfolio, benchmark_df, initial_capital, ticker='Strategy', transactions=None, zoom_days=None, custom_start_day=None, custom_end_day=None, custom_start_hour=None, custom_end_hour=None):
-    # Calculate performance metrics for strategy
-    strategy_metrics = calculate_performance_metrics(portfolio['total'])
+def backtest_many(df_map, signals_map, initial_capital=10000.0, max_workers=None, **kwargs):
+    """
+    Backtest several tickers in parallel worker processes.
     
-    # Calculate performance metrics for buy & hold benchmark
-    benchmark = benchmark_df['Close'].reindex(portfolio.index).ffill()
-    normalized_benchmark = benchmark / benchmark.iloc[0].item() * initial_capital
-    benchmark_metrics = calculate_performance_metrics(normalized_benchmark)
+    df_map and signals_map are dicts keyed by ticker; extra keyword arguments
+    are passed through to backtest_strategy. The workers record transactions
+    but write no log file (they would all write the same transactions.txt);
+    write one from the returned transactions if needed. Returns
+    {ticker: (portfolio, transactions)}.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            ticker: pool.submit(backtest_strategy, df, signals_map[ticker], initial_capital,
+                                **{**kwargs, 'log_path': None})
+            for ticker, df in df_map.items()
+        }
+        return {ticker: future.result() for ticker, future in futures.items()}
 
-    # Apply zoom or custom date range if specified
+def _align_benchmark(benchmark_df, index):
+    """Benchmark close prices reindexed and forward-filled onto a portfolio index"""
+    close = benchmark_df['Close']
+    # The benchmark usually comes from the same ticker/period/interval as the
+    # portfolio; then reindexing is a no-op and only real gaps need filling
+    if close.index is index or close.index.equals(index):
+        return close.ffill() if close.isna().to_numpy().any() else close
+    return close.reindex(index).ffill()
+
+# Scatter styles for transaction markers, in legend order: entries are larger
+# filled markers, exits smaller hollow/outlined ones
+_TRANSACTION_MARKERS = {
+    'BUY': dict(color='green', s=100, marker='o', edgecolors='darkgreen', linewidth=1.5),
+    'SHORT': dict(color='red', s=100, marker='v', edgecolors='darkred', linewidth=1.5),
+    'SELL': dict(color='white', s=80, marker='o', edgecolors='darkred', linewidth=2.0),
+    'COVER': dict(color='white', s=80, marker='v', edgecolors='darkgreen', linewidth=2.0),
+    'EXIT_LONG': dict(color='lightblue', s=70, marker='s', edgecolors='blue', linewidth=1.5),
+    'EXIT_SHORT': dict(color='lightcoral', s=70, marker='^', edgecolors='maroon', linewidth=1.5),
+}
+
+def _minmax_decimate(x, y, n_bins=PLOT_DECIMATE_BINS):
+    """
+    Thin a line to the lowest and highest point of each of n_bins equal bins,
+    kept in time order so spikes and drawdowns still show at full-period scale.
+    """
+    y = np.asarray(y, dtype=np.float64).reshape(len(x), -1)[:, 0]
+    n = len(y)
+    bin_size = -(-n // n_bins)
+    n_rows = -(-n // bin_size)
+    
+    # Pad the last bin so the series reshapes into (n_rows, bin_size)
+    padded = np.full(n_rows * bin_size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_rows, bin_size)
+    lo = np.where(np.isnan(padded), np.inf, padded).argmin(axis=1)
+    hi = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    
+    offsets = np.arange(n_rows) * bin_size
+    idx = np.sort(np.column_stack((lo + offsets, hi + offsets)), axis=1).ravel()
+    return x[idx], y[idx]
+
+def _transactions_between(transactions, start_date, end_date):
+    """Transactions dated within [start_date, end_date]; the log is in date order"""
+    dates = transactions['Date']
+    k0 = dates.searchsorted(start_date, side='left')
+    k1 = dates.searchsorted(end_date, side='right')
+    return transactions.iloc[k0:k1]
+
+def normalize_benchmark(benchmark_df, index, initial_capital):
+    """
+    Buy & hold benchmark on a portfolio index, scaled to start at initial_capital.
+    
+    plot_portfolio computes this itself; callers drawing several plots of the
+    same run can compute it once and pass it in as normalized_benchmark.
+    """
+    benchmark = _align_benchmark(benchmark_df, index)
+    if isinstance(benchmark, pd.DataFrame):
+        benchmark = benchmark.iloc[:, 0]
+    benchmark_values = benchmark.to_numpy(dtype=np.float64)
+    return pd.Series(benchmark_values * (initial_capital / benchmark_values[0]), index=benchmark.index)
+
+def _resolve_range(index, ticker, zoom_days=None, custom_start_day=None, custom_end_day=None,
+                   custom_start_hour=None, custom_end_hour=None):
+    """
+    Positional [start, end) bounds of the window plot_portfolio should draw,
+    with its title label and filename suffix (empty for the full period).
+    Out-of-range requests are clamped; returns None if the range is invalid.
+    """
     if custom_start_hour is not None and custom_end_hour is not None:
         # Hour-based custom range (e.g., hour 2 to hour 4)
-        # Calculate intervals per hour based on the interval setting
-        interval_mapping = {
-            '1m': 60,   # 60 intervals per hour
-            '2m': 30,   # 30 intervals per hour
-            '5m': 12,   # 12 intervals per hour
-            '15m': 4,   # 4 intervals per hour
-            '30m': 2,   # 2 intervals per hour
-            '1h': 1,    # 1 interval per hour
-        }
-        
-        # Try to extract interval from ticker string or use default for 5m
-        intervals_per_hour = 12  # Default for 5m
-        for interval_key in interval_mapping:
-            if interval_key in ticker:
-                intervals_per_hour = interval_mapping[interval_key]
-                break
+        # Intervals per hour from the interval embedded in the ticker label
+        # (e.g. 'PLNT_15m_3'); default to 5m data
+        match = _INTERVAL_RE.search(ticker)
+        intervals_per_hour = _INTERVALS_PER_HOUR[match.group(1)] if match else 12
         
-        total_hours = len(portfolio) // intervals_per_hour
+        total_hours = len(index) // intervals_per_hour
         
         # Validate hour ranges
         if custom_start_hour < 0 or custom_end_hour >= total_hours:
@@ -496,28 +703,22 @@ def plot_portfolio(portfolio, benchmark_df, initial_capital, ticker='Strategy',
         
         if custom_start_hour >= custom_end_hour:
             print(f"Error: Invalid range - start hour {custom_start_hour} >= end hour {custom_end_hour}")
-            return
+            return None
         
         # Convert hours to data point indices
         start_idx = custom_start_hour * intervals_per_hour
         end_idx = (custom_end_hour + 1) * intervals_per_hour
         
-        portfolio_zoom = portfolio.iloc[start_idx:end_idx]
-        benchmark_zoom = normalized_benchmark.iloc[start_idx:end_idx]
-        
-        # Filter transactions by the actual date range
-        start_date = portfolio_zoom.index[0]
-        end_date = portfolio_zoom.index[-1]
-        transactions_zoom = [t for t in transactions if start_date <= t['Date'] <= end_date] if transactions else []
-        
-        plot_title = f'{ticker} Strategy vs Buy & Hold (Hour {custom_start_hour} to {custom_end_hour})'
-        filename_suffix = f"_custom_h{custom_start_hour}_to_h{custom_end_hour}"
-        
+        start_date = index[start_idx]
+        end_date = index[end_idx - 1]
         print(f"Custom hour range: Hour {custom_start_hour} to {custom_end_hour} ({start_date.strftime('%m-%d %H:%M')} to {end_date.strftime('%m-%d %H:%M')}) [{intervals_per_hour} intervals/hour]")
         
-    elif custom_start_day is not None and custom_end_day is not None:
+        return (start_idx, end_idx, f"Hour {custom_start_hour} to {custom_end_hour}",
+                f"_custom_h{custom_start_hour}_to_h{custom_end_hour}")
+    
+    if custom_start_day is not None and custom_end_day is not None:
         # Custom day range (e.g., day 21 to day 34)
-        total_days = len(portfolio)
+        total_days = len(index)
         
         # Validate day ranges
         if custom_start_day < 0 or custom_end_day >= total_days:
@@ -528,41 +729,52 @@ def plot_portfolio(portfolio, benchmark_df, initial_capital, ticker='Strategy',
         
         if custom_start_day >= custom_end_day:
             print(f"Error: Invalid range - start day {custom_start_day} >= end day {custom_end_day}")
-            return
-        
-        # Use integer indexing for day-based slicing
-        portfolio_zoom = portfolio.iloc[custom_start_day:custom_end_day+1]
-        benchmark_zoom = normalized_benchmark.iloc[custom_start_day:custom_end_day+1]
-        
-        # Filter transactions by the actual date range
-        start_date = portfolio_zoom.index[0]
-        end_date = portfolio_zoom.index[-1]
-        transactions_zoom = [t for t in transactions if start_date <= t['Date'] <= end_date] if transactions else []
-        
-        plot_title = f'{ticker} Strategy vs Buy & Hold (Day {custom_start_day} to {custom_end_day})'
-        filename_suffix = f"_custom_{custom_start_day}_to_{custom_end_day}"
+            return None
         
+        start_date = index[custom_start_day]
+        end_date = index[custom_end_day]
         print(f"Custom range: Day {custom_start_day} to {custom_end_day} ({start_date.strftime('%m-%d %H:%M')} to {end_date.strftime('%m-%d %H:%M')})")
         
-    elif zoom_days:
-        # Regular zoom (last N days)
-        end_date = portfolio.index[-1]
-        start_date = end_date - pd.Timedelta(days=zoom_days)
-        
-        # Filter data for zoom
-        portfolio_zoom = portfolio[portfolio.index >= start_date]
-        benchmark_zoom = normalized_benchmark[normalized_benchmark.index >= start_date]
-        transactions_zoom = [t for t in transactions if t['Date'] >= start_date] if transactions else []
-        
-        plot_title = f'{ticker} Strategy vs Buy & Hold (Last {zoom_days} days)'
-        filename_suffix = f"_zoom_{zoom_days}d"
+        return (custom_start_day, custom_end_day + 1, f"Day {custom_start_day} to {custom_end_day}",
+                f"_custom_{custom_start_day}_to_{custom_end_day}")
+    
+    if zoom_days:
+        # Regular zoom (last N days); binary search on the sorted index
+        start_date = index[-1] - pd.Timedelta(days=zoom_days)
+        return (index.searchsorted(start_date), len(index), f"Last {zoom_days} days",
+                f"_zoom_{zoom_days}d")
+    
+    return 0, len(index), "Full Period", ""
+
+def plot_portfolio(portfolio, benchmark_df, initial_capital, ticker='Strategy', transactions=None, zoom_days=None, custom_start_day=None, custom_end_day=None, custom_start_hour=None, custom_end_hour=None, normalized_benchmark=None, dpi=150):
+    if transactions is None:
+        transactions = pd.DataFrame(columns=['Date', 'Action'])
+    
+    # Calculate performance metrics for strategy
+    strategy_metrics = calculate_performance_metrics(portfolio['total'])
+    
+    # Calculate performance metrics for buy & hold benchmark
+    if normalized_benchmark is None:
+        normalized_benchmark = normalize_benchmark(benchmark_df, portfolio.index, initial_capital)
+    benchmark_metrics = calculate_performance_metrics(normalized_benchmark)
+
+    # Apply zoom or custom date range if specified
+    plot_range = _resolve_range(portfolio.index, ticker, zoom_days, custom_start_day, custom_end_day,
+                                custom_start_hour, custom_end_hour)
+    if plot_range is None:
+        return
+    start_idx, end_idx, range_label, filename_suffix = plot_range
+    plot_title = f'{ticker} Strategy vs Buy & Hold ({range_label})'
+    
+    if filename_suffix:
+        portfolio_zoom = portfolio.iloc[start_idx:end_idx]
+        benchmark_zoom = normalized_benchmark.iloc[start_idx:end_idx]
+        transactions_zoom = _transactions_between(transactions, portfolio_zoom.index[0], portfolio_zoom.index[-1])
     else:
         # Full period
         portfolio_zoom = portfolio
         benchmark_zoom = normalized_benchmark
-        transactions_zoom = transactions if transactions else []
-        plot_title = f'{ticker} Strategy vs Buy & Hold (Full Period)'
-        filename_suffix = ""
+        transactions_zoom = transactions
 
     
     # Clear any existing plots and create new figure
@@ -571,91 +783,46 @@ def plot_portfolio(portfolio, benchmark_df, initial_capital, ticker='Strategy',
 
     # Plot your strategy
     strategy_total = portfolio_zoom['total'].dropna()
-    # print(f"Strategy data points: {len(strategy_total)}")
-    print(f"Strategy min: {strategy_total.min()}, max: {strategy_total.max()}")
+    if DEBUG and not strategy_total.empty:
+        total_np = strategy_total.to_numpy()
+        print(f"Strategy data points: {len(total_np)}")
+        print(f"Strategy min: {total_np.min()}, max: {total_np.max()}")
+    
+    # Only the full-period view is decimated; zoomed ranges plot every bar
+    decimate = filename_suffix == "" and len(portfolio_zoom) > PLOT_MAX_POINTS
     
     if not strategy_total.empty:
-        # Use the axes directly
-        ax.plot(strategy_total.index, strategy_total.values, label=f'{ticker} Strategy', color='blue', linewidth=2)
+        # Hand matplotlib plain arrays rather than pandas objects
+        strategy_x, strategy_y = strategy_total.index.to_numpy(), strategy_total.to_numpy()
+        if decimate:
+            strategy_x, strategy_y = _minmax_decimate(strategy_x, strategy_y)
+        # Plot data only needs display precision; metrics above stay float64
+        strategy_y = strategy_y.astype(np.float32, copy=False)
+        ax.plot(strategy_x, strategy_y, label=f'{ticker} Strategy', color='blue', linewidth=2)
     else:
         print("Warning: Strategy portfolio is empty or all NaN")
     
     # Add benchmark line
-    ax.plot(benchmark_zoom.index, benchmark_zoom.values, label='Buy & Hold', color='orange', linewidth=2)
+    benchmark_x, benchmark_y = benchmark_zoom.index.to_numpy(), benchmark_zoom.to_numpy()
+    if decimate:
+        benchmark_x, benchmark_y = _minmax_decimate(benchmark_x, benchmark_y)
+    benchmark_y = benchmark_y.astype(np.float32, copy=False)
+    ax.plot(benchmark_x, benchmark_y, label='Buy & Hold', color='orange', linewidth=2)
     
     # Add transaction markers based on all transaction types - plotted on benchmark line
-    if transactions_zoom:
-        # Initialize lists for each transaction type
-        buy_dates, buy_values = [], []
-        sell_dates, sell_values = [], []
-        short_dates, short_values = [], []
-        cover_dates, cover_values = [], []
-        exit_long_dates, exit_long_values = [], []
-        exit_short_dates, exit_short_values = [], []
-        
-        for transaction in transactions_zoom:
-            date = transaction['Date']
-            action = transaction['Action']
-            
-            # Get benchmark value at transaction date
-            if date in benchmark_zoom.index:
-                benchmark_value = benchmark_zoom.loc[date]
-                
-                # Ensure we have a scalar value, not a Series
-                if hasattr(benchmark_value, 'iloc'):
-                    benchmark_value = benchmark_value.iloc[0] if len(benchmark_value) > 0 else benchmark_value
-                
-                benchmark_value = float(benchmark_value)
-                
-                # Categorize transactions by action type
-                if action == 'BUY':
-                    buy_dates.append(date)
-                    buy_values.append(benchmark_value)
-                elif action == 'SELL':
-                    sell_dates.append(date)
-                    sell_values.append(benchmark_value)
-                elif action == 'SHORT':
-                    short_dates.append(date)
-                    short_values.append(benchmark_value)
-                elif action == 'COVER':
-                    cover_dates.append(date)
-                    cover_values.append(benchmark_value)
-                elif action == 'EXIT_LONG':
-                    exit_long_dates.append(date)
-                    exit_long_values.append(benchmark_value)
-                elif action == 'EXIT_SHORT':
-                    exit_short_dates.append(date)
-                    exit_short_values.append(benchmark_value)
+    if not transactions_zoom.empty:
+        # Look up the benchmark value at every transaction date in one go;
+        # transactions outside the plotted benchmark are skipped
+        on_benchmark = transactions_zoom['Date'].isin(benchmark_zoom.index).to_numpy()
+        tx_dates = transactions_zoom['Date'].to_numpy()[on_benchmark]
+        tx_actions = transactions_zoom['Action'].to_numpy()[on_benchmark]
+        tx_values = benchmark_zoom.reindex(tx_dates).to_numpy(dtype=np.float64)
         
         # Plot each transaction type with distinct markers and colors
-        marker_size = 100
-        edge_width = 1.5
-        
-        # Entry signals (larger, filled markers)
-        if buy_dates:
-            ax.scatter(buy_dates, buy_values, color='green', s=marker_size, marker='o', 
-                     zorder=6, label='BUY', edgecolors='darkgreen', linewidth=edge_width, alpha=0.9)
-        
-        if short_dates:
-            ax.scatter(short_dates, short_values, color='red', s=marker_size, marker='v', 
-                     zorder=6, label='SHORT', edgecolors='darkred', linewidth=edge_width, alpha=0.9)
-        
-        # Exit signals (smaller, hollow/outlined markers)
-        if sell_dates:
-            ax.scatter(sell_dates, sell_values, color='white', s=marker_size*0.8, marker='o', 
-                     zorder=6, label='SELL', edgecolors='darkred', linewidth=edge_width+0.5, alpha=0.9)
-        
-        if cover_dates:
-            ax.scatter(cover_dates, cover_values, color='white', s=marker_size*0.8, marker='v', 
-                     zorder=6, label='COVER', edgecolors='darkgreen', linewidth=edge_width+0.5, alpha=0.9)
-        
-        if exit_long_dates:
-            ax.scatter(exit_long_dates, exit_long_values, color='lightblue', s=marker_size*0.7, marker='s', 
-                     zorder=6, label='EXIT_LONG', edgecolors='blue', linewidth=edge_width, alpha=0.9)
-        
-        if exit_short_dates:
-            ax.scatter(exit_short_dates, exit_short_values, color='lightcoral', s=marker_size*0.7, marker='^', 
-                     zorder=6, label='EXIT_SHORT', edgecolors='maroon', linewidth=edge_width, alpha=0.9)
+        for action, style in _TRANSACTION_MARKERS.items():
+            mask = tx_actions == action
+            if mask.any():
+                ax.scatter(tx_dates[mask], tx_values[mask], label=action, zorder=6, alpha=0.9, **style)
     
     # Create performance metrics text
     metrics_text = (
@@ -680,82 +847,131 @@ def plot_portfolio(portfolio, benchmark_df, initial_capital, ticker='Strategy',
     ax.grid(True, alpha=0.3)
     
     # Improve date formatting on x-axis
-    import matplotlib.dates as mdates
     ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
     ax.xaxis.set_major_locator(mdates.DayLocator(interval=max(1, len(portfolio_zoom) // 2000)))
     plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
     
     plt.tight_layout()
     filename = f"portfolio_vs_spy{filename_suffix}.png"
-    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    plt.savefig(filename, dpi=dpi, bbox_inches='tight')
     print(f"Plot saved as '{filename}'")
+    plt.close(fig)
+
+def plot_many(portfolio, benchmark_df, initial_capital, ticker, transactions, plot_specs,
+              normalized_benchmark=None, max_workers=None):
+    """
+    Render several plot_portfolio views of one backtest in parallel worker
+    processes. Each entry of plot_specs holds the keyword arguments of one
+    plot, e.g. dict(zoom_days=7) or dict(custom_start_day=10, custom_end_day=60).
+    """
+    if not plot_specs:
+        return
+    if normalized_benchmark is None:
+        normalized_benchmark = normalize_benchmark(benchmark_df, portfolio.index, initial_capital)
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(plot_portfolio, portfolio, benchmark_df, initial_capital, ticker, transactions,
+                        normalized_benchmark=normalized_benchmark, **spec)
+            for spec in plot_specs
+        ]
+        for future in futures:
+            future.result()
+
+@njit(cache=True)
+def _summarize(action_codes, returns):
+    """
+    Single pass over the transaction log: per-action counts, plus sum and
+    count of risk-exit returns and sum, count, best and worst of closed-trade
+    (non-entry) returns. Unknown actions (code -1) only count as closed trades.
+    """
+    counts = np.zeros(N_ACTIONS, dtype=np.int64)
+    risk_sum = 0.0
+    n_risk = 0
+    exit_sum = 0.0
+    n_exits = 0
+    best_return = -np.inf
+    worst_return = np.inf
+    for j in range(len(action_codes)):
+        code = action_codes[j]
+        ret = returns[j]
+        if code >= 0:
+            counts[code] += 1
+        if code >= STOP_LOSS:
+            risk_sum += ret
+            n_risk += 1
+        if code != BUY and code != SHORT:
+            exit_sum += ret
+            n_exits += 1
+            best_return = max(best_return, ret)
+            worst_return = min(worst_return, ret)
+    return counts, risk_sum, n_risk, exit_sum, n_exits, best_return, worst_return
 
 def analyze_trading_patterns(portfolio, transactions, ticker):
     """Enhanced trading pattern analysis with risk management insights"""
-    if not transactions:
+    if transactions is None or transactions.empty:
         return
     
     print(f"\n=== Enhanced Trading Analysis for {ticker} ===")
     
     # Basic trading stats
-    total_days = (transactions[-1]['Date'] - transactions[0]['Date']).days
+    dates = transactions['Date']
+    actions = transactions['Action']
+    total_days = (dates.iloc[-1] - dates.iloc[0]).days
     avg_trades_per_day = len(transactions) / total_days if total_days > 0 else 0
     
-    # Categorize transactions
-    buys = [t for t in transactions if t['Action'] == 'BUY']
-    sells = [t for t in transactions if t['Action'] in ['SELL', 'EXIT_LONG', 'EXIT_SHORT']]
-    shorts = [t for t in transactions if t['Action'] == 'SHORT']
-    covers = [t for t in transactions if t['Action'] == 'COVER']
-    stop_losses = [t for t in transactions if 'STOP_LOSS' in t['Action']]
-    take_profits = [t for t in transactions if 'TAKE_PROFIT' in t['Action']]
-    trailing_stops = [t for t in transactions if 'TRAILING_STOP' in t['Action']]
+    # Categorize transactions by action code (-1 for labels outside ACTIONS)
+    codes = pd.Categorical(actions, categories=ACTIONS).codes
+    returns = transactions['Return'].to_numpy(dtype=np.float64)
+    summarize = _summarize if len(codes) > SUMMARIZE_JIT_MIN else getattr(_summarize, 'py_func', _summarize)
+    counts, risk_sum, n_risk, exit_sum, n_exits, best_return, worst_return = summarize(codes, returns)
     
     print(f"Trading Frequency: {len(transactions)} transactions over {total_days} days ({avg_trades_per_day:.2f}/day)")
-    entries = len(buys) + len(shorts)
-    exits = len(sells)
+    entries = counts[BUY] + counts[SHORT]
+    exits = counts[SELL] + counts[EXIT_LONG] + counts[EXIT_SHORT]
     print(f"Entries: {entries} | Normal Exits: {exits}")
-    print(f"Stop Losses: {len(stop_losses)} | Take Profits: {len(take_profits)} | Trailing Stops: {len(trailing_stops)}")
+    print(f"Stop Losses: {counts[STOP_LOSS:STOP_LOSS + 2].sum()} | "
+          f"Take Profits: {counts[TAKE_PROFIT:TAKE_PROFIT + 2].sum()} | "
+          f"Trailing Stops: {counts[TRAILING_STOP:TRAILING_STOP + 2].sum()}")
     
     # Risk management effectiveness
-    risk_exits = stop_losses + take_profits + trailing_stops
-    if risk_exits:
-        avg_risk_return = sum(t['Return'] for t in risk_exits) / len(risk_exits)
-        print(f"Risk Management Exits: {len(risk_exits)} (avg return: {avg_risk_return:.2f}%)")
+    if n_risk:
+        avg_risk_return = risk_sum / n_risk
+        print(f"Risk Management Exits: {n_risk} (avg return: {avg_risk_return:.2f}%)")
     
     # Performance analysis
-    if len(transactions) >= 2:
-        returns = [t['Return'] for t in transactions if t['Action'] not in ['BUY', 'SHORT']]
-        if returns:
-            best_return = max(returns)
-            worst_return = min(returns)
-            avg_return = sum(returns) / len(returns)
-            print(f"Best trade: {best_return:.2f}% | Worst trade: {worst_return:.2f}% | Average: {avg_return:.2f}%")
+    if len(transactions) >= 2 and n_exits:
+        avg_return = exit_sum / n_exits
+        print(f"Best trade: {best_return:.2f}% | Worst trade: {worst_return:.2f}% | Average: {avg_return:.2f}%")
     
     # Recent activity
-    recent_cutoff = transactions[-1]['Date'] - pd.Timedelta(days=7)
-    recent_trades = [t for t in transactions if t['Date'] >= recent_cutoff]
-    print(f"Recent activity (last 7 days): {len(recent_trades)} transactions")
+    recent_cutoff = dates.iloc[-1] - pd.Timedelta(days=7)
+    recent_count = len(dates) - dates.searchsorted(recent_cutoff)
+    print(f"Recent activity (last 7 days): {recent_count} transactions")
 
-def create_custom_range_plot(portfolio, benchmark, initial_capital, ticker, transactions, start_day, end_day):
+def create_custom_range_plot(portfolio, benchmark, initial_capital, ticker, transactions, start_day, end_day,
+                             normalized_benchmark=None):
     """Create a plot for a custom day range (e.g., day 21 to day 34)"""
     plot_portfolio(portfolio, benchmark, initial_capital, ticker, transactions, 
-                  custom_start_day=start_day, custom_end_day=end_day)
+                  custom_start_day=start_day, custom_end_day=end_day,
+                  normalized_benchmark=normalized_benchmark)
     print(f"Custom range plot created: Day {start_day} to Day {end_day}")
 
-def create_custom_zoom_plot(portfolio, benchmark, initial_capital, ticker, transactions, start_days_ago, end_days_ago=0):
+def create_custom_zoom_plot(portfolio, benchmark, initial_capital, ticker, transactions, start_days_ago, end_days_ago=0,
+                            normalized_benchmark=None):
     """Create a custom zoom plot for a specific date range"""
     end_date = portfolio.index[-1] - pd.Timedelta(days=end_days_ago)
     start_date = end_date - pd.Timedelta(days=start_days_ago)
     
     # Custom zoom parameters
     zoom_days = start_days_ago - end_days_ago
-    plot_portfolio(portfolio, benchmark, initial_capital, f"{ticker}_custom", transactions, zoom_days=zoom_days)
+    plot_portfolio(portfolio, benchmark, initial_capital, f"{ticker}_custom", transactions, zoom_days=zoom_days,
+                   normalized_benchmark=normalized_benchmark)
     print(f"Custom zoom plot created: {start_days_ago} to {end_days_ago} days ago")
 
 def suggest_custom_ranges(portfolio, num_ranges=4):
     """Suggest optimal custom day ranges based on data length"""
     total_days = len(portfolio)
-    ranges = []
     
     if total_days < 20:
         print(f"Warning: Only {total_days} data points available. Custom ranges may not be meaningful.")
@@ -764,13 +980,10 @@ def suggest_custom_ranges(portfolio, num_ranges=4):
     # Create evenly distributed ranges
     segment_size = total_days // (num_ranges + 1)
     
-    for i in range(num_ranges):
-        start = i * segment_size + segment_size // 2
-        end = start + min(segment_size, 20)  # Limit range size to 20 days max
-        end = min(end, total_days - 1)
-        
-        if start < end:
-            ranges.append((start, end))
+    starts = np.arange(num_ranges) * segment_size + segment_size // 2
+    ends = np.minimum(starts + min(segment_size, 20), total_days - 1)  # Limit range size to 20 days max
+    valid = starts < ends
+    ranges = list(zip(starts[valid].tolist(), ends[valid].tolist()))
     
     print(f"Suggested custom ranges for {total_days} data points:")
     for i, (start, end) in enumerate(ranges):
@@ -1,12 +1,51 @@
 import yfinance as yf
 import pandas as pd
 import os
+import time
 
 # Default configuration constants
 DEFAULT_PERIOD = "2y"  # Default period for data fetching
 DEFAULT_INTERVAL = "1d"  # Default interval (daily)
 
-def fetch_data(ticker, start_date=None, end_date=None, period=None, interval=DEFAULT_INTERVAL, save_to_csv=False, progress=True):
+# Download cache (relative to the working directory, like the CSV exports)
+CACHE_DIR = ".cache"
+CACHE_TTL_INTRADAY = 4 * 60 * 60  # seconds a cached intraday download stays fresh
+CACHE_TTL_DAILY = 24 * 60 * 60    # seconds a cached daily (or longer) download stays fresh
+DOWNLOAD_MEMO_SIZE = 32            # downloads kept in memory per process
+
+# Downloads made by this process: request -> (download time, raw frame).
+# Entries expire after the same TTL as the disk cache.
+_download_memo = {}
+
+def _cache_path(ticker, period, interval, start_date, end_date):
+    """Cache file for one download request"""
+    span = period if period else f"{start_date}_{end_date}"
+    return os.path.join(CACHE_DIR, f"{ticker}_{interval}_{span}.pkl")
+
+def _cache_ttl(interval):
+    """How long a cached download is reused; intraday bars go stale sooner"""
+    return CACHE_TTL_INTRADAY if interval.endswith(('m', 'h')) else CACHE_TTL_DAILY
+
+def _download(ticker, period, interval, start_date, end_date, progress):
+    """Raw yfinance download for one request"""
+    if period:
+        return yf.download(
+            ticker,
+            period=period,
+            interval=interval,
+            auto_adjust=True,
+            progress=progress,
+        )
+    return yf.download(
+        ticker,
+        start=start_date,
+        end=end_date,
+        interval=interval,
+        auto_adjust=True,
+        progress=progress,
+    )
+
+def fetch_data(ticker, start_date=None, end_date=None, period=None, interval=DEFAULT_INTERVAL, save_to_csv=False, progress=True, use_cache=True, columns=None):
     """
     Enhanced data fetcher with flexible time control
     
@@ -18,6 +57,8 @@ def fetch_data(ticker, start_date=None, end_date=None, period=None, interval=DEF
         interval: Data interval (1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo)
         save_to_csv: Whether to save data to CSV file
         progress: Show download progress
+        use_cache: Reuse a recent download of the same request (in memory or from CACHE_DIR)
+        columns: Subset of the OHLCV columns to keep (default: all of them)
     
     Returns:
         DataFrame with OHLCV data
@@ -31,27 +72,36 @@ def fetch_data(ticker, start_date=None, end_date=None, period=None, interval=DEF
         period = DEFAULT_PERIOD
         print(f"No date range or period specified, using default period: {period}")
     
-    # Download data
-    if period:
-        df = yf.download(
-            ticker,
-            period=period,
-            interval=interval,
-            auto_adjust=True,
-            progress=progress,
-        )
+    # Download data, or reuse a fresh copy of the same request from this
+    # process's memo or from the disk cache
+    key = (ticker, period, interval, start_date, end_date)
+    ttl = _cache_ttl(interval)
+    cache_path = _cache_path(ticker, period, interval, start_date, end_date)
+    memo = _download_memo.get(key) if use_cache else None
+    if memo is not None and time.time() - memo[0] < ttl:
+        df = memo[1].copy()
+    elif (use_cache and os.path.exists(cache_path)
+            and time.time() - os.path.getmtime(cache_path) < ttl):
+        df = pd.read_pickle(cache_path)
     else:
-        df = yf.download(
-            ticker,
-            start=start_date,
-            end=end_date,
-            interval=interval,
-            auto_adjust=True,
-            progress=progress,
-        )
-    
-    if df.empty:
-        raise ValueError(f"No data downloaded for ticker: {ticker}")
+        raw = _download(ticker, period, interval, start_date, end_date, progress)
+        df = raw.copy()
+        
+        if df.empty:
+            raise ValueError(f"No data downloaded for ticker: {ticker}")
+        
+        if use_cache:
+            # Only a fresh download is memoized and written to disk
+            _download_memo.pop(key, None)
+            if len(_download_memo) >= DOWNLOAD_MEMO_SIZE:
+                del _download_memo[next(iter(_download_memo))]
+            _download_memo[key] = (time.time(), raw)
+            
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Write then rename, so concurrent workers never read a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
     
     # Handle MultiIndex columns (occurs with multiple tickers)
     if isinstance(df.columns, pd.MultiIndex):
@@ -64,7 +114,10 @@ def fetch_data(ticker, start_date=None, end_date=None, period=None, interval=DEF
     expected_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
     if 'Adj Close' in df.columns:
         expected_cols.append('Adj Close')
-    df = df[[col for col in expected_cols if col in df.columns]]
+    if columns is not None:
+        expected_cols = [col for col in expected_cols if col in columns]
+    available = set(df.columns)
+    df = df[[col for col in expected_cols if col in available]]
     
     # Save to CSV if requested
     if save_to_csv:
@@ -93,7 +146,7 @@ def fetch_hourly(ticker, period="60d"):
     return fetch_data(ticker, period=period, interval="1h", save_to_csv=True, progress=False)
 
 # Legacy function for backward compatibility
-def fetch_data_legacy(ticker, start_date, end_date):
+def fetch_data_legacy(ticker, start_date, end_date, columns=None):
     """Legacy function to maintain backward compatibility"""
-    return fetch_data(ticker, start_date=start_date, end_date=end_date)
+    return fetch_data(ticker, start_date=start_date, end_date=end_date, columns=columns)
 
@@ -7,6 +7,7 @@ TICKER     = 'PLNT'
 PERIOD     = "30d"      # 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max (longer period for more data)
 INTERVAL   = "5m"       # 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo (hourly for even less noise)
 INITIAL_CAPITAL = 10000.0
+BENCHMARK_TICKER = TICKER  # buy & hold benchmark; e.g. 'SPY' to compare against the market
 
 
 # Risk Management params
@@ -65,10 +66,9 @@ CUSTOM_HOUR_RANGES    = [(2, 4), (8, 12), (20, 24)]
 
 # ====================================
 
+from data_fetcher import fetch_data
 from strategy import *
 from backtest import *
-import yfinance as yf
-import yfinance as yf
 
 
 def main():
@@ -137,16 +137,17 @@ def main():
         print(e)
         return
 
-    # 2) Download benchmark data
-    benchmark = yf.download(
-        TICKER,
-        period=PERIOD,
-        interval=INTERVAL,
-        auto_adjust=True
-    )
-    if benchmark.empty:
-        print("Could not download benchmark data.")
-        return
+    # 2) Benchmark is buy & hold on the same price data the strategy traded,
+    #    unless a separate benchmark ticker is configured
+    if BENCHMARK_TICKER == TICKER:
+        benchmark = df
+    else:
+        try:
+            benchmark = fetch_data(BENCHMARK_TICKER, period=PERIOD, interval=INTERVAL,
+                                   progress=False, columns=['Close', 'Adj Close'])
+        except ValueError as e:
+            print(e)
+            return
 
     # 3) Backtest with risk management
     portfolio, transactions = backtest_strategy(
@@ -161,45 +162,31 @@ def main():
         spread_pct=SPREAD_PCT
     )
 
-    # 4) Full-period plot
-    plot_portfolio(
-        portfolio,
-        benchmark,
-        INITIAL_CAPITAL,
-        f"{TICKER}_{INTERVAL}_{STRATEGY}",
-        transactions
-    )
-
-    # 5) Optional zoom & custom plots
+    # 4) Plot specs: the full-period plot at full resolution, then the
+    #    optional zoom & custom plots
+    plot_specs = [dict(dpi=300)]
     if GENERATE_ZOOM_PLOTS:
-        plot_portfolio(portfolio, benchmark, INITIAL_CAPITAL,
-                       f"{TICKER}_{INTERVAL}_{STRATEGY}", transactions,
-                       zoom_days=7)
-        plot_portfolio(portfolio, benchmark, INITIAL_CAPITAL,
-                       f"{TICKER}_{INTERVAL}_{STRATEGY}", transactions,
-                       zoom_days=14)
+        plot_specs += [dict(zoom_days=7), dict(zoom_days=14)]
 
     if GENERATE_CUSTOM_RANGE:
-        ranges = CUSTOM_RANGES or suggest_custom_ranges(portfolio) if AUTO_SUGGEST_RANGES else CUSTOM_RANGES
-        for start_day, end_day in ranges:
-            plot_portfolio(portfolio, benchmark, INITIAL_CAPITAL,
-                           f"{TICKER}_{INTERVAL}_{STRATEGY}", transactions,
-                           custom_start_day=start_day,
-                           custom_end_day=end_day)
+        ranges = suggest_custom_ranges(portfolio) if AUTO_SUGGEST_RANGES and not CUSTOM_RANGES else CUSTOM_RANGES
+        plot_specs += [dict(custom_start_day=start_day, custom_end_day=end_day)
+                       for start_day, end_day in ranges]
 
     if GENERATE_HOUR_RANGES:
-        for start_hour, end_hour in CUSTOM_HOUR_RANGES:
-            plot_portfolio(portfolio, benchmark, INITIAL_CAPITAL,
-                           f"{TICKER}_{INTERVAL}_{STRATEGY}", transactions,
-                           custom_start_hour=start_hour,
-                           custom_end_hour=end_hour)
+        plot_specs += [dict(custom_start_hour=start_hour, custom_end_hour=end_hour)
+                       for start_hour, end_hour in CUSTOM_HOUR_RANGES]
+
+    # 5) Render every plot in parallel worker processes
+    plot_many(portfolio, benchmark, INITIAL_CAPITAL,
+              f"{TICKER}_{INTERVAL}_{STRATEGY}", transactions, plot_specs)
 
     # 6) Transaction summary & analysis
-    if transactions:
+    if not transactions.empty:
         print("\nTransaction Summary:")
         print(f"Strategy: {STRATEGY}")
         print(f"Total transactions: {len(transactions)}")
-        print(f"Final return: {transactions[-1]['Return']:.2f}%")
+        print(f"Final return: {transactions['Return'].iloc[-1]:.2f}%")
         print(f"Timeframe: {PERIOD} @ {INTERVAL}\n")
         analyze_trading_patterns(portfolio, transactions, TICKER)
     
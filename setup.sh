@@ -16,4 +16,27 @@ source quantenv/bin/activate
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Compile the numba kernels into their on-disk cache now, so the first
+# backtest does not pay JIT compile time (no-op without numba)
+python - <<'PY'
+import numpy as np
+import pandas as pd
+from _njit import NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from signals import (moving_average_signals, mean_reversion_signals, williamsr_signals, rsi_signals, matei_signals,
+                         init_matei_state, step_matei)
+    from backtest import backtest_strategy, _summarize
+
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(size=500))
+    df = pd.DataFrame({'Close': close, 'High': close + 1, 'Low': close - 1},
+                      index=pd.date_range('2024-01-01', periods=len(close), freq='5min'))
+    for signals in (moving_average_signals(df, 5, 20), mean_reversion_signals(df, 20, 1.0),
+                    williamsr_signals(df), rsi_signals(df), matei_signals(df)):
+        backtest_strategy(df, signals, log_transactions=False, stop_loss_pct=0.02, take_profit_pct=0.05)
+    _summarize(np.zeros(1, dtype=np.int8), np.zeros(1))
+    step_matei(init_matei_state(df), close[-1] + 1, close[-1] - 1, close[-1])
+    print("Numba kernels compiled.")
+PY
+
 echo "Setup complete. To activate later: source quantenv/bin/activate"
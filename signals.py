@@ -1,53 +1,330 @@
+from dataclasses import dataclass
+
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from _njit import njit, NUMBA_AVAILABLE
+
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+def _move_reduce(values, window, min_count, ufunc):
+    """
+    Trailing-window reduction with ufunc (np.fmax / np.fmin, which skip NaN);
+    windows with fewer than min_count non-NaN values give NaN, like
+    pandas rolling(min_periods=min_count).
+    """
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    padded = np.concatenate((np.full(window - 1, np.nan), values))
+    out = ufunc.reduce(sliding_window_view(padded, window), axis=1)
+    valid = np.concatenate(([0], np.cumsum(~np.isnan(values))))
+    ends = np.arange(1, n + 1)
+    out[valid[ends] - valid[np.maximum(ends - window, 0)] < min_count] = np.nan
+    return out
+
+def _move_max(values, window, min_count):
+    """Rolling max of a float64 array; bottleneck when installed"""
+    # bottleneck rejects windows longer than the series, pandas does not
+    if bn is not None and window <= len(values):
+        return bn.move_max(values, window=window, min_count=min_count)
+    return _move_reduce(values, window, min_count, np.fmax)
+
+def _move_min(values, window, min_count):
+    """Rolling min of a float64 array; bottleneck when installed"""
+    # bottleneck rejects windows longer than the series, pandas does not
+    if bn is not None and window <= len(values):
+        return bn.move_min(values, window=window, min_count=min_count)
+    return _move_reduce(values, window, min_count, np.fmin)
+
+def _rolling(values, window, min_count):
+    """pandas rolling window over a 1-D array, or down the columns of a 2-D one"""
+    frame = pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+    return frame.rolling(window, min_periods=min_count)
+
+def _flat_windows(values, window, min_count):
+    """
+    Where the trailing window along the first (time) axis holds a single
+    repeated value, and that value, as (mask, level) arrays. Running sums
+    (bottleneck's, and pandas' over a long history) leave rounding residue on
+    such windows. NaN-free input only needs a running count of bar-to-bar
+    changes (none may fall inside the window); with NaNs the window's
+    max and min are compared.
+    """
+    n = len(values)
+    if n and np.isnan(values).any():
+        if bn is not None and window <= n:
+            hi = bn.move_max(values, window=window, min_count=min_count, axis=0)
+            return hi == bn.move_min(values, window=window, min_count=min_count, axis=0), hi
+        rolling = _rolling(values, window, min_count)
+        hi = rolling.max().to_numpy()
+        return hi == rolling.min().to_numpy(), hi
+    
+    # changes[i]: bars j <= i whose value differs from bar j-1; a window is
+    # flat when the count is the same at its first and last bar
+    changes = np.empty(values.shape, dtype=np.int32)
+    changes[:1] = 0
+    np.cumsum(values[1:] != values[:-1], axis=0, dtype=np.int32, out=changes[1:])
+    flat = np.empty(values.shape, dtype=bool)
+    lag = min(window - 1, n)
+    np.equal(changes[:lag], 0, out=flat[:lag])
+    np.equal(changes[lag:], changes[:n - lag], out=flat[lag:])
+    # Windows with fewer than min_count bars have no statistics at all
+    flat[:min_count - 1] = False
+    return flat, values
+
+def _move_mean(values, window, min_count, flat=None):
+    """
+    Rolling mean along the first (time) axis; bottleneck when installed.
+    flat is _flat_windows' result for the same window, if already computed.
+    """
+    if bn is not None and window <= len(values):
+        mean = bn.move_mean(values, window=window, min_count=min_count, axis=0)
+        # Constant windows average to exactly their value, as with pandas
+        mask, level = _flat_windows(values, window, min_count) if flat is None else flat
+        np.copyto(mean, level, where=mask)
+        return mean
+    return _rolling(values, window, min_count).mean().to_numpy()
+
+def _move_std(values, window, min_count, flat=None):
+    """
+    Rolling sample (ddof=1) standard deviation along the first (time) axis;
+    flat as for _move_mean
+    """
+    if bn is not None and window <= len(values):
+        std = bn.move_std(values, window=window, min_count=min_count, ddof=1, axis=0)
+    else:
+        std = _rolling(values, window, min_count).std().to_numpy(copy=True)
+    # Constant windows have exactly zero spread
+    mask, _ = _flat_windows(values, window, min_count) if flat is None else flat
+    np.copyto(std, 0.0, where=mask & ~np.isnan(std))
+    return std
 
-def moving_average_signals(df, short_window, long_window):
-    signals = pd.DataFrame(index=df.index)
-    signals['signal'] = 0.0
+@njit('float64[:](Array(float64, 1, "A", readonly=True), int64)', cache=True, nogil=True)
+def _rsi(price, period):
+    """
+    RSI from simple rolling means of price gains and losses (min_periods=1),
+    computed in one pass with running window sums over a ring buffer
+    """
+    n = len(price)
+    out = np.empty(n, dtype=np.float64)
+    gains = np.zeros(period, dtype=np.float64)
+    losses = np.zeros(period, dtype=np.float64)
+    valid = np.zeros(period, dtype=np.bool_)
+    gain_sum = 0.0
+    loss_sum = 0.0
+    count = 0
+    for i in range(n):
+        k = i % period
+        # Drop the change leaving the window
+        if valid[k]:
+            gain_sum -= gains[k]
+            loss_sum -= losses[k]
+            count -= 1
+        delta = price[i] - price[i - 1] if i > 0 else np.nan
+        valid[k] = not np.isnan(delta)
+        if valid[k]:
+            gains[k] = max(delta, 0.0)
+            losses[k] = max(-delta, 0.0)
+            gain_sum += gains[k]
+            loss_sum += losses[k]
+            count += 1
+        # Running sums can drift just below zero once a window is all flat,
+        # so only strictly positive sums count as gains/losses
+        if count > 0 and loss_sum > 0:
+            out[i] = 100 - (100 / (1 + gain_sum / loss_sum))
+        elif count > 0 and gain_sum > 0:
+            out[i] = 100.0  # no losses in the window
+        else:
+            out[i] = np.nan
+    return out
 
+def _rsi_vectorized(price, period):
+    """
+    _rsi without numba: the same RSI from rolling means of the price gains
+    and losses, with the same rules for windows without losses or gains
+    (_move_mean averages a window of no moves to exactly 0)
+    """
+    rsi = np.full(len(price), np.nan)
+    if len(price) < 2:
+        return rsi
+    # The first bar has no price change
+    delta = np.diff(price)
+    avg_gain = _move_mean(np.maximum(delta, 0.0), period, 1)
+    avg_loss = _move_mean(np.maximum(-delta, 0.0), period, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(100, 1 + avg_gain / avg_loss, out=rsi[1:])
+    np.subtract(100, rsi[1:], out=rsi[1:])
+    np.copyto(rsi[1:], 100.0, where=(avg_loss <= 0) & (avg_gain > 0))
+    np.copyto(rsi[1:], np.nan, where=(avg_loss <= 0) & ~(avg_gain > 0))
+    return rsi
+
+def _positions(signal):
+    """
+    signal.diff() on a raw int8 array (along time): 0 on the first bar, then
+    bar-to-bar changes, still int8 (a flip is at most +/-2)
+    """
+    return np.diff(signal, axis=0, prepend=signal[:1])
+
+def _signal_frame(columns, index, return_arrays):
+    """Signal columns as a DataFrame on index, or the dict of arrays itself with return_arrays"""
+    return columns if return_arrays else pd.DataFrame(columns, index=index, copy=False)
+
+def _williams_r(df, price_col, period, min_count):
+    """
+    Williams %R over period bars as a float64 array; NaN until min_count
+    bars are in the window and wherever the window is flat
+    """
+    hh = _move_max(df['High'].to_numpy(dtype=np.float64), period, min_count)
+    ll = _move_min(df['Low'].to_numpy(dtype=np.float64), period, min_count)
+    num = hh - df[price_col].to_numpy(dtype=np.float64)
+    num *= -100.0
+    den = hh - ll
+    # Flat windows (zero range) have no defined %R
+    flat = den == 0
+    wr = np.divide(num, den, out=num, where=~flat)
+    wr[flat] = np.nan
+    return wr
+
+def moving_average_signals(df, short_window, long_window, return_arrays=False):
     price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+    price = df[price_col].to_numpy(dtype=np.float64)
 
-    signals['short_mavg'] = df[price_col].rolling(window=short_window, min_periods=1).mean()
-    signals['long_mavg'] = df[price_col].rolling(window=long_window, min_periods=1).mean()
+    short_mavg = _move_mean(price, short_window, 1)
+    long_mavg = _move_mean(price, long_window, 1)
 
-    signals.loc[signals.index[short_window:], 'signal'] = np.where(
-        signals['short_mavg'][short_window:] > signals['long_mavg'][short_window:], 1.0, -1.0
-    )
+    # -1/0/+1 signal as int8
+    signal = np.where(short_mavg > long_mavg, np.int8(1), np.int8(-1))
+    signal[:short_window] = 0
 
-    signals['positions'] = signals['signal'].diff()
+    return _signal_frame({
+        'signal':     signal,
+        'short_mavg': short_mavg,
+        'long_mavg':  long_mavg,
+        'positions':  _positions(signal),
+    }, df.index, return_arrays)
 
-    return signals
+def _mean_reversion(price, window, threshold):
+    """
+    Z-score, signal and positions arrays for mean reversion; price is 1-D or
+    a 2-D (time, ticker) matrix
+    """
+    # rolling stats, sharing one scan for constant windows
+    flat = _flat_windows(price, window, 1)
+    rolling_mean = _move_mean(price, window, 1, flat)
+    rolling_std  = _move_std(price, window, 1, flat)
+    # A flat window has no z-score (0/0 with exact stats); keep it NaN so it
+    # never trades, even if the mean carries rounding residue
+    rolling_std = np.where(rolling_std == 0, np.nan, rolling_std)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zscore = (price - rolling_mean) / rolling_std
 
-def mean_reversion_signals(df, window, threshold):
-    signals = pd.DataFrame(index=df.index)
-    signals['signal'] = 0.0
+    # only assign from the first full window onward: +1 below -threshold,
+    # else -1 above threshold; NaN z-scores fail both tests and stay flat
+    z = zscore[window:]
+    below = z < -threshold
+    signal = np.zeros(price.shape, dtype=np.int8)
+    np.subtract(below, (z > threshold) & ~below, out=signal[window:], dtype=np.int8)
+    return zscore, signal, _positions(signal)
 
+def mean_reversion_signals(df, window, threshold, return_arrays=False):
     price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
-    price = df[price_col]
-    # rolling stats
-    rolling_mean = price.rolling(window=window, min_periods=1).mean()
-    rolling_std  = price.rolling(window=window, min_periods=1).std()
-    signals['zscore'] = (price - rolling_mean) / rolling_std
-
-    # only assign from the first full window onward
-    signals.loc[signals.index[window:], 'signal'] = np.where(
-        signals['zscore'][window:] < -threshold, 1.0,
-        np.where(signals['zscore'][window:] > threshold, -1.0, 0.0)
-    )
+    zscore, signal, positions = _mean_reversion(df[price_col].to_numpy(dtype=np.float64), window, threshold)
 
-    signals['positions'] = signals['signal'].diff()
-    return signals
+    return _signal_frame({
+        'signal':    signal,
+        'zscore':    zscore,
+        'positions': positions,
+    }, df.index, return_arrays)
+
+def mean_reversion_signals_batch(prices, window, threshold):
+    """
+    mean_reversion_signals for several tickers in one pass.
+
+    prices is a DataFrame of close prices with one column per ticker on a
+    shared index; the rolling stats sweep the whole (time, ticker) matrix at
+    once. Tickers should share a trading calendar, since windows count rows
+    of the shared index. Returns {ticker: signals} with the same columns as
+    mean_reversion_signals.
+    """
+    zscore, signal, positions = _mean_reversion(prices.to_numpy(dtype=np.float64), window, threshold)
+    return {
+        ticker: pd.DataFrame({
+            'signal':    signal[:, j],
+            'zscore':    zscore[:, j],
+            'positions': positions[:, j],
+        }, index=prices.index)
+        for j, ticker in enumerate(prices.columns)
+    }
 
 import pandas as pd
 import numpy as np
 
+# Williams %R condition bits, one per threshold test
+WR_LONG_ENTRY, WR_LONG_EXIT, WR_SHORT_ENTRY, WR_SHORT_EXIT = 1, 2, 4, 8
+
+def _williamsr_transitions():
+    """
+    Next state for every (state, condition code) pair; states are indexed
+    0 = short, 1 = flat, 2 = long. Mirrors the if/elif chain of the original
+    per-bar loop, so overlapping thresholds resolve the same way.
+    """
+    table = np.empty((3, 16), dtype=np.int8)
+    for prev in (-1, 0, 1):
+        for code in range(16):
+            if prev != 1 and code & WR_LONG_ENTRY:
+                curr = 1
+            elif prev == 1 and code & WR_LONG_EXIT:
+                curr = 0
+            elif prev != -1 and code & WR_SHORT_ENTRY:
+                curr = -1
+            elif prev == -1 and code & WR_SHORT_EXIT:
+                curr = 0
+            else:
+                curr = prev
+            table[prev + 1, code] = curr + 1
+    return table
+
+_WR_TRANSITIONS = _williamsr_transitions()
+
+@njit('int8[:](Array(int8, 1, "A", readonly=True), Array(int8, 2, "A", readonly=True))',
+      cache=True, nogil=True)
+def _williamsr_state(codes, transitions):
+    """Walk the condition codes through the transition table, starting flat"""
+    n = len(codes)
+    out = np.empty(n, dtype=np.int8)
+    state = 1
+    for i in range(n):
+        state = transitions[state, codes[i]]
+        out[i] = state - 1
+    return out
+
+def _williamsr_state_scan(codes, transitions):
+    """
+    Loop-free equivalent of _williamsr_state, used when numba is missing.
+    Each bar's code selects a map over the three states; a doubling prefix
+    scan composes them, so the state at every bar comes out of log2(n)
+    vectorized passes instead of n interpreted steps.
+    """
+    maps = transitions.T[codes]  # maps[i, s]: state after bar i given state s before it
+    step = 1
+    while step < len(maps):
+        maps[step:] = np.take_along_axis(maps[step:], maps[:-step], axis=1)
+        step *= 2
+    return maps[:, 1] - 1
+
 def williamsr_signals(
     df: pd.DataFrame,
     period: int = 14,
     long_entry_thresh: float = -80.0,
     long_exit_thresh: float = -50.0,
     short_entry_thresh: float = -20.0,
-    short_exit_thresh: float = -50.0
+    short_exit_thresh: float = -50.0,
+    return_arrays: bool = False
 ) -> pd.DataFrame:
     """
     Compute stateful Williams %R signals with separate long/short entry & exit.
@@ -66,79 +343,310 @@ def williamsr_signals(
         Go short when %R ≥ this (e.g. -20).
     short_exit_thresh : float
         Exit short when %R ≤ this (e.g. -50).
+    return_arrays : bool
+        Return the columns as a dict of arrays instead of a DataFrame.
 
     Returns
     -------
     signals : pd.DataFrame
         Columns:
-          • wr          : the Williams %R series  
-          • signal      : +1 long, -1 short, 0 flat (stateful)  
-          • positions   : signal.diff()  
+          • wr          : the Williams %R series (float32)  
+          • signal      : +1 long, -1 short, 0 flat (stateful, int8)  
+          • positions   : signal.diff(), 0 on the first bar (int8)  
     """
     price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
-    hh = df['High'].rolling(period, min_periods=period).max()
-    ll = df['Low'] .rolling(period, min_periods=period).min()
-    rng = (hh - ll).replace(0, np.nan)
-    wr = -100.0 * (hh - df[price_col]) / rng
-
-    # build stateful signal series
-    signal = pd.Series(0.0, index=df.index)
-    prev = 0.0
-    for t in df.index:
-        v = wr.loc[t]
-        if np.isnan(v):
-            curr = prev
-        else:
-            if prev != 1.0 and v <= long_entry_thresh:
-                curr = 1.0
-            elif prev == 1.0 and v >= long_exit_thresh:
-                curr = 0.0
-            elif prev != -1.0 and v >= short_entry_thresh:
-                curr = -1.0
-            elif prev == -1.0 and v <= short_exit_thresh:
-                curr = 0.0
-            else:
-                curr = prev
-        signal.loc[t] = curr
-        prev = curr
+    wr_a = _williams_r(df, price_col, period, period)
+
+    # build stateful signal series from per-bar condition codes; NaN %R
+    # fails every test, so it holds the previous state
+    codes = (
+        (wr_a <= long_entry_thresh) * np.int8(WR_LONG_ENTRY)
+        | (wr_a >= long_exit_thresh) * np.int8(WR_LONG_EXIT)
+        | (wr_a >= short_entry_thresh) * np.int8(WR_SHORT_ENTRY)
+        | (wr_a <= short_exit_thresh) * np.int8(WR_SHORT_EXIT)
+    )
+    williamsr_state = _williamsr_state if NUMBA_AVAILABLE else _williamsr_state_scan
+    signal = williamsr_state(codes, _WR_TRANSITIONS)
 
-    signals = pd.DataFrame({
-        'wr':        wr,
-        'signal':   signal,
-    })
-    signals['positions'] = signals['signal'].diff().fillna(0.0)
-    return signals
+    # Thresholds were applied in float64 above; %R is stored at float32 and
+    # the -1/0/+1 signal and its changes as int8
+    return _signal_frame({
+        'wr':        wr_a.astype(np.float32),
+        'signal':    signal,
+        'positions': _positions(signal),
+    }, df.index, return_arrays)
 
-def rsi_signals(df, period=14, buy_threshold=30, sell_threshold=70):
+def rsi_signals(df, period=14, buy_threshold=30, sell_threshold=70, return_arrays=False):
     """
     Pure RSI strategy signals
     
     Buy when RSI <= buy_threshold (oversold)
     Sell when RSI >= sell_threshold (overbought)
-    """
-    signals = pd.DataFrame(index=df.index)
-    signals['signal'] = 0.0
     
+    return_arrays=True returns the columns as a dict of arrays instead of a DataFrame
+    """
     price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
     
-    # Calculate RSI
-    delta = df[price_col].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=period, min_periods=1).mean()
-    avg_loss = loss.rolling(window=period, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    signals['rsi'] = 100 - (100 / (1 + rs))
+    # Calculate RSI (interpreted, the kernel's loop is far slower than rolling means)
+    rsi_func = _rsi if NUMBA_AVAILABLE else _rsi_vectorized
+    rsi = rsi_func(df[price_col].to_numpy(dtype=np.float64), period)
+    
+    # Generate signals using the consistent indexing pattern (-1/0/+1 as int8)
+    signal = np.zeros(len(rsi), dtype=np.int8)
+    signal[period:] = np.where(
+        rsi[period:] <= buy_threshold, 1,
+        np.where(rsi[period:] >= sell_threshold, -1, 0)
+    )
+    
+    return _signal_frame({
+        'signal':    signal,
+        'rsi':       rsi,
+        'positions': _positions(signal),
+    }, df.index, return_arrays)
+
+@njit(cache=True, nogil=True)
+def _matei_transition(prev, rsi_val, wr_val, vol_val,
+                      rsi_buy_th, rsi_sell_th, wr_buy_th, wr_sell_th, vol_buy_th, vol_sell_th):
+    """Next Matei state from the previous one and one bar's indicators"""
+    # Skip if any indicator has NaN values (one fused test, no short-circuit branches)
+    if np.isnan(rsi_val) | np.isnan(wr_val) | np.isnan(vol_val):
+        return prev
+    
+    # Long entry conditions (all must be true)
+    long_entry = (
+        prev != 1 and  # Not already long
+        rsi_val <= rsi_buy_th and
+        wr_val <= wr_buy_th and
+        vol_val <= vol_buy_th
+    )
+    
+    # Long exit conditions (any can be true)
+    long_exit = (
+        prev == 1 and  # Currently long
+        (rsi_val >= rsi_sell_th or
+         wr_val >= wr_sell_th or
+         vol_val >= vol_sell_th)
+    )
+    
+    # Short entry conditions (all must be true)
+    short_entry = (
+        prev != -1 and  # Not already short
+        rsi_val >= rsi_sell_th and
+        wr_val >= wr_sell_th and
+        vol_val >= vol_sell_th
+    )
     
-    # Generate signals using the consistent indexing pattern
-    signals.loc[signals.index[period:], 'signal'] = np.where(
-        signals['rsi'][period:] <= buy_threshold, 1.0,
-        np.where(signals['rsi'][period:] >= sell_threshold, -1.0, 0.0)
+    # Short exit conditions (any can be true)
+    short_exit = (
+        prev == -1 and  # Currently short
+        (rsi_val <= rsi_buy_th or
+         wr_val <= wr_buy_th or
+         vol_val <= vol_buy_th)
     )
     
-    signals['positions'] = signals['signal'].diff()
+    # Apply state transitions (optimized for better signal flow)
+    if long_entry:
+        return 1
+    elif short_entry:
+        return -1
+    elif long_exit:
+        return -1  # Exit long and immediately enter short
+    elif short_exit:
+        return 1   # Exit short and immediately enter long (triggers COVER)
+    return prev  # Hold current position
+
+@njit('int8[:](Array(float64, 1, "A", readonly=True), Array(float64, 1, "A", readonly=True), '
+      'Array(float64, 1, "A", readonly=True), int64, float64, float64, float64, float64, float64, float64)',
+      cache=True, nogil=True)
+def _matei_state(rsi, wr, vol, max_period, rsi_buy_th, rsi_sell_th, wr_buy_th, wr_sell_th, vol_buy_th, vol_sell_th):
+    """
+    Stateful Matei signal per bar. Flat until max_period bars are available;
+    a NaN in any indicator holds the previous state.
+    """
+    n = len(rsi)
+    out = np.zeros(n, dtype=np.int8)
+    prev = 0
+    for i in range(max_period, n):
+        prev = _matei_transition(prev, rsi[i], wr[i], vol[i],
+                                 rsi_buy_th, rsi_sell_th, wr_buy_th, wr_sell_th, vol_buy_th, vol_sell_th)
+        out[i] = prev
+    return out
+
+# Slots of the Matei indicator state arrays (see _matei_buffers)
+_GAIN_SUM, _LOSS_SUM, _VOL_MEAN, _VOL_SSD, _PREV_CLOSE = range(5)
+_BAR, _RSI_COUNT, _VOL_COUNT, _HI_HEAD, _HI_LEN, _LO_HEAD, _LO_LEN = range(7)
+
+@njit(cache=True, nogil=True)
+def _matei_buffers(rsi_period, wr_period, vol_lookback):
+    """
+    Empty running state for _matei_update: float and int scalar slots, the
+    RSI and return ring buffers and the %R window deques
+    """
+    fs = np.zeros(5, dtype=np.float64)
+    fs[_PREV_CLOSE] = np.nan
+    return (
+        fs, np.zeros(7, dtype=np.int64),
+        # RSI: the last rsi_period price changes
+        np.zeros(rsi_period, dtype=np.float64), np.zeros(rsi_period, dtype=np.float64),
+        np.zeros(rsi_period, dtype=np.bool_),
+        # Volatility: the last vol_lookback returns
+        np.zeros(vol_lookback, dtype=np.float64), np.zeros(vol_lookback, dtype=np.bool_),
+        # Williams %R: bar index and value of candidate highs/lows, oldest
+        # first, as ring buffers (a window holds at most wr_period of them)
+        np.zeros(wr_period, dtype=np.int64), np.zeros(wr_period, dtype=np.float64),
+        np.zeros(wr_period, dtype=np.int64), np.zeros(wr_period, dtype=np.float64),
+    )
+
+@njit(cache=True, nogil=True)
+def _ring(pos, size):
+    """Ring buffer slot of pos, for 0 <= pos < 2 * size (no integer division)"""
+    return pos - size if pos >= size else pos
+
+@njit(cache=True, nogil=True)
+def _matei_feed(buffers, close, high, low):
+    """
+    Run the Matei indicators over a block of bars, continuing from and
+    updating the running state in buffers (see _matei_buffers); returns the
+    block's RSI, Williams %R and volatility. Same semantics as _rsi,
+    _williams_r(min_count=1) and a rolling sample std of returns
+    (min_periods=1). Window max/min use monotonic deques; the std uses
+    Welford updates as returns enter and leave the window.
+    """
+    fs, iv, gains, losses, rsi_valid, returns, vol_valid, hi_idx, hi_val, lo_idx, lo_val = buffers
+    rsi_period = len(gains)
+    wr_period = len(hi_idx)
+    vol_lookback = len(returns)
+    
+    # The scalar state lives in locals for the whole block
+    gain_sum, loss_sum = fs[_GAIN_SUM], fs[_LOSS_SUM]
+    vol_mean, vol_ssd = fs[_VOL_MEAN], fs[_VOL_SSD]
+    prev_close = fs[_PREV_CLOSE]
+    start, rsi_count, vol_count = iv[_BAR], iv[_RSI_COUNT], iv[_VOL_COUNT]
+    hi_head, hi_len, lo_head, lo_len = iv[_HI_HEAD], iv[_HI_LEN], iv[_LO_HEAD], iv[_LO_LEN]
+    
+    n = len(close)
+    rsi = np.empty(n, dtype=np.float64)
+    wr = np.empty(n, dtype=np.float64)
+    vol = np.empty(n, dtype=np.float64)
+    for j in range(n):
+        i = start + j  # bar number since the state was created
+        
+        # RSI (same arithmetic as _rsi)
+        k = i % rsi_period
+        if rsi_valid[k]:
+            gain_sum -= gains[k]
+            loss_sum -= losses[k]
+            rsi_count -= 1
+        delta = close[j] - prev_close
+        rsi_valid[k] = not np.isnan(delta)
+        if rsi_valid[k]:
+            gains[k] = max(delta, 0.0)
+            losses[k] = max(-delta, 0.0)
+            gain_sum += gains[k]
+            loss_sum += losses[k]
+            rsi_count += 1
+        if rsi_count > 0 and loss_sum > 0:
+            rsi[j] = 100 - (100 / (1 + gain_sum / loss_sum))
+        elif rsi_count > 0 and gain_sum > 0:
+            rsi[j] = 100.0
+        else:
+            rsi[j] = np.nan
+        
+        # Williams %R (same arithmetic as _williams_r); NaN highs/lows are
+        # skipped. The deques are rings starting at *_head.
+        while hi_len > 0 and hi_idx[hi_head] <= i - wr_period:
+            hi_head = _ring(hi_head + 1, wr_period)
+            hi_len -= 1
+        while lo_len > 0 and lo_idx[lo_head] <= i - wr_period:
+            lo_head = _ring(lo_head + 1, wr_period)
+            lo_len -= 1
+        if not np.isnan(high[j]):
+            while hi_len > 0 and hi_val[_ring(hi_head + hi_len - 1, wr_period)] <= high[j]:
+                hi_len -= 1
+            tail = _ring(hi_head + hi_len, wr_period)
+            hi_idx[tail] = i
+            hi_val[tail] = high[j]
+            hi_len += 1
+        if not np.isnan(low[j]):
+            while lo_len > 0 and lo_val[_ring(lo_head + lo_len - 1, wr_period)] >= low[j]:
+                lo_len -= 1
+            tail = _ring(lo_head + lo_len, wr_period)
+            lo_idx[tail] = i
+            lo_val[tail] = low[j]
+            lo_len += 1
+        if hi_len == 0 or lo_len == 0:
+            wr[j] = np.nan
+        else:
+            hh = hi_val[hi_head]
+            den = hh - lo_val[lo_head]
+            wr[j] = (hh - close[j]) * -100.0 / den if den != 0 else np.nan
+        
+        # Volatility: sample std of the returns in the window
+        k = i % vol_lookback
+        if vol_valid[k]:
+            vol_count -= 1
+            if vol_count == 0:
+                vol_mean = 0.0
+                vol_ssd = 0.0
+            else:
+                old = returns[k]
+                delta = old - vol_mean
+                vol_mean -= delta / vol_count
+                vol_ssd -= delta * (old - vol_mean)
+        ret = close[j] / prev_close - 1
+        vol_valid[k] = not np.isnan(ret)
+        if vol_valid[k]:
+            returns[k] = ret
+            vol_count += 1
+            delta = ret - vol_mean
+            vol_mean += delta / vol_count
+            vol_ssd += delta * (ret - vol_mean)
+        vol[j] = np.sqrt(max(vol_ssd, 0.0) / (vol_count - 1)) if vol_count > 1 else np.nan
+        
+        prev_close = close[j]
+    
+    fs[_GAIN_SUM], fs[_LOSS_SUM] = gain_sum, loss_sum
+    fs[_VOL_MEAN], fs[_VOL_SSD] = vol_mean, vol_ssd
+    fs[_PREV_CLOSE] = prev_close
+    iv[_BAR], iv[_RSI_COUNT], iv[_VOL_COUNT] = start + n, rsi_count, vol_count
+    iv[_HI_HEAD], iv[_HI_LEN], iv[_LO_HEAD], iv[_LO_LEN] = hi_head, hi_len, lo_head, lo_len
+    return rsi, wr, vol
+
+@njit('UniTuple(float64[:], 3)(Array(float64, 1, "A", readonly=True), Array(float64, 1, "A", readonly=True), '
+      'Array(float64, 1, "A", readonly=True), int64, int64, int64)', cache=True, nogil=True)
+def _matei_indicators(close, high, low, rsi_period, wr_period, vol_lookback):
+    """RSI, Williams %R and volatility for matei_signals in one pass over the bars"""
+    return _matei_feed(_matei_buffers(rsi_period, wr_period, vol_lookback), close, high, low)
+
+def matei_indicators(df, rsi_period=72, wr_period=72, vol_lookback=72):
+    """
+    RSI, Williams %R and return volatility for matei_signals, as float64
+    arrays (rsi, wr, vol). Compute them once and pass them to matei_signals
+    as indicators= to sweep the thresholds without repeating this pass.
+    """
+    price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+    close = df[price_col].to_numpy(dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        # All three indicators in a single compiled pass over the bars
+        rsi, wr, vol = _matei_indicators(close, df['High'].to_numpy(dtype=np.float64),
+                                         df['Low'].to_numpy(dtype=np.float64),
+                                         rsi_period, wr_period, vol_lookback)
+    else:
+        # Calculate RSI
+        rsi = _rsi_vectorized(close, rsi_period)
+        
+        # Calculate Williams %R
+        wr = _williams_r(df, price_col, wr_period, 1)
+        
+        # Calculate Volatility (rolling std of bar-to-bar returns)
+        returns = np.empty_like(close)
+        returns[:1] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(close[1:], close[:-1], out=returns[1:])
+        returns[1:] -= 1
+        vol = _move_std(returns, vol_lookback, 1)
     
-    return signals
+    return rsi, wr, vol
 
 def matei_signals(
     df,
@@ -150,7 +658,9 @@ def matei_signals(
     wr_buy_th=-85,
     wr_sell_th=-15,
     vol_buy_th=0.007,
-    vol_sell_th=0.000
+    vol_sell_th=0.000,
+    return_arrays=False,
+    indicators=None
 ):
     """
     Matei's triple indicator strategy: RSI + Williams %R + Volatility filter
@@ -160,100 +670,81 @@ def matei_signals(
     - Exit long when: RSI >= rsi_sell_th OR Williams %R >= wr_sell_th OR Volatility >= vol_sell_th
     - Enter short when: RSI >= rsi_sell_th AND Williams %R >= wr_sell_th AND Volatility >= vol_sell_th
     - Exit short when: RSI <= rsi_buy_th OR Williams %R <= wr_buy_th OR Volatility <= vol_buy_th
-    """
-    signals = pd.DataFrame(index=df.index)
-    signals['signal'] = 0.0
-    
-    price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
     
-    # Calculate RSI
-    delta = df[price_col].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=rsi_period, min_periods=1).mean()
-    avg_loss = loss.rolling(window=rsi_period, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    signals['rsi'] = 100 - (100 / (1 + rs))
-    
-    # Calculate Williams %R
-    highest_high = df['High'].rolling(window=wr_period, min_periods=1).max()
-    lowest_low = df['Low'].rolling(window=wr_period, min_periods=1).min()
-    price_range = highest_high - lowest_low
-    price_range[price_range == 0] = np.nan
-    signals['wr'] = (highest_high - df[price_col]) / price_range * -100
-    
-    # Calculate Volatility
-    signals['vol'] = df[price_col].pct_change().rolling(window=vol_lookback, min_periods=1).std()
+    return_arrays=True returns the columns as a dict of arrays instead of a DataFrame;
+    indicators takes matei_indicators(df, rsi_period, wr_period, vol_lookback)
+    computed beforehand, e.g. once for a sweep over the thresholds
+    """
+    # Every column is computed as a plain array and the frame is built once
+    if indicators is None:
+        indicators = matei_indicators(df, rsi_period, wr_period, vol_lookback)
+    rsi, wr, vol = indicators
     
     # Build stateful signal series (similar to Williams %R approach)
-    signal = pd.Series(0.0, index=df.index)
-    prev = 0.0
     max_period = max(rsi_period, wr_period, vol_lookback)
+    signal = _matei_state(rsi, wr, vol, max_period,
+                          rsi_buy_th, rsi_sell_th, wr_buy_th, wr_sell_th, vol_buy_th, vol_sell_th)
     
-    for i, t in enumerate(df.index):
-        if i < max_period:
-            # Not enough data for reliable signals
-            signal.loc[t] = 0.0
-            prev = 0.0
-            continue
-            
-        rsi_val = signals.loc[t, 'rsi']
-        wr_val = signals.loc[t, 'wr']
-        vol_val = signals.loc[t, 'vol']
-        
-        # Skip if any indicator has NaN values
-        if pd.isna(rsi_val) or pd.isna(wr_val) or pd.isna(vol_val):
-            signal.loc[t] = prev
-            continue
-        
-        # Long entry conditions (all must be true)
-        long_entry = (
-            prev != 1.0 and  # Not already long
-            rsi_val <= rsi_buy_th and
-            wr_val <= wr_buy_th and
-            vol_val <= vol_buy_th
-        )
-        
-        # Long exit conditions (any can be true)
-        long_exit = (
-            prev == 1.0 and  # Currently long
-            (rsi_val >= rsi_sell_th or
-             wr_val >= wr_sell_th or
-             vol_val >= vol_sell_th)
-        )
-        
-        # Short entry conditions (all must be true)
-        short_entry = (
-            prev != -1.0 and  # Not already short
-            rsi_val >= rsi_sell_th and
-            wr_val >= wr_sell_th and
-            vol_val >= vol_sell_th
-        )
-        
-        # Short exit conditions (any can be true)
-        short_exit = (
-            prev == -1.0 and  # Currently short
-            (rsi_val <= rsi_buy_th or
-             wr_val <= wr_buy_th or
-             vol_val <= vol_buy_th)
-        )
-        
-        # Apply state transitions (optimized for better signal flow)
-        if long_entry:
-            curr = 1.0
-        elif short_entry:
-            curr = -1.0
-        elif long_exit:
-            curr = -1.0  # Exit long and immediately enter short
-        elif short_exit:
-            curr = 1.0   # Exit short and immediately enter long (triggers COVER)
-        else:
-            curr = prev  # Hold current position
-        
-        signal.loc[t] = curr
-        prev = curr
+    positions = _positions(signal)
     
-    signals['signal'] = signal
-    signals['positions'] = signals['signal'].diff()
-    
-    return signals
\ No newline at end of file
+    # Thresholds were applied in float64 above; indicators are stored at
+    # float32 and the -1/0/+1 signal as int8
+    return _signal_frame({
+        'signal':    signal,
+        'rsi':       rsi.astype(np.float32),
+        'wr':        wr.astype(np.float32),
+        'vol':       vol.astype(np.float32),
+        'positions': positions,
+    }, df.index, return_arrays)
+
+@dataclass
+class MateiState:
+    """
+    Running state of the Matei strategy for live updates; create it with
+    init_matei_state and advance it with step_matei
+    """
+    buffers: tuple      # indicator state, see _matei_buffers
+    max_period: int     # bars before the strategy may leave flat
+    thresholds: tuple   # (rsi_buy_th, rsi_sell_th, wr_buy_th, wr_sell_th, vol_buy_th, vol_sell_th)
+    signal: int = 0     # current -1/0/+1 state
+
+def init_matei_state(
+    df,
+    rsi_period=72,
+    wr_period=72,
+    vol_lookback=72,
+    rsi_buy_th=60,
+    rsi_sell_th=40,
+    wr_buy_th=-85,
+    wr_sell_th=-15,
+    vol_buy_th=0.007,
+    vol_sell_th=0.000
+):
+    """
+    Matei strategy state warmed up on the bars in df (same arguments as
+    matei_signals; df may be empty). Feeding the following bars to
+    step_matei gives the signals matei_signals would give on the full history.
+    """
+    price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+    thresholds = tuple(float(th) for th in
+                       (rsi_buy_th, rsi_sell_th, wr_buy_th, wr_sell_th, vol_buy_th, vol_sell_th))
+    state = MateiState(_matei_buffers(rsi_period, wr_period, vol_lookback),
+                       max(rsi_period, wr_period, vol_lookback), thresholds)
+    if len(df):
+        rsi, wr, vol = _matei_feed(state.buffers, df[price_col].to_numpy(dtype=np.float64),
+                                   df['High'].to_numpy(dtype=np.float64), df['Low'].to_numpy(dtype=np.float64))
+        state.signal = int(_matei_state(rsi, wr, vol, state.max_period, *thresholds)[-1])
+    return state
+
+def step_matei(state, high, low, close):
+    """
+    Advance state by one bar in O(1) time; returns the bar's signal and its
+    change from the previous bar (matei_signals' signal and positions)
+    """
+    rsi, wr, vol = _matei_feed(state.buffers, np.array([close], dtype=np.float64),
+                               np.array([high], dtype=np.float64), np.array([low], dtype=np.float64))
+    prev = state.signal
+    # _BAR now counts this bar; the batch state machine starts at bar max_period
+    if state.buffers[1][_BAR] > state.max_period:
+        state.signal = int(_matei_transition(prev, rsi[0], wr[0], vol[0], *state.thresholds))
+    return state.signal, state.signal - prev
@@ -1,7 +1,57 @@
-from data_fetcher import fetch_data, fetch_data_legacy
-from signals import *
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
 
-def generate_moving_avg_crossover_strat(ticker, start_date=None, end_date=None, short_window=20, long_window=50, period=None, interval="1d"):
+# pandas/NumPy, the data fetcher (yfinance), the signal kernels and the
+# backtester (matplotlib) are imported inside the functions that use them,
+# so importing this module stays cheap and each generator only loads its own
+
+__all__ = [
+    'generate_moving_avg_crossover_strat',
+    'generate_mean_reversal_strat',
+    'generate_mean_reversal_batch',
+    'generate_williamsr_strat',
+    'generate_rsi_strat',
+    'generate_matei_strat',
+    'run_strategies_async',
+    'run_strategies',
+    'run_grid',
+]
+
+# Columns each kind of strategy reads ('Adj Close' is only kept if present)
+CLOSE_COLUMNS = ('Close', 'Adj Close')
+HLC_COLUMNS = ('High', 'Low', 'Close', 'Adj Close')
+
+# Storage dtypes for the fetched price frame, by generator precision argument
+PRECISIONS = {'f8': 'float64', 'f4': 'float32'}
+
+# Default cap on run_strategies' worker processes, each of which loads the
+# full stack and downloads from Yahoo at the same time as the others
+MAX_STRATEGY_WORKERS = 8
+
+def _fetch(ticker, start_date, end_date, period, interval, columns, precision='f8'):
+    """
+    Price data for a generator: start/end dates alone use the legacy fetcher,
+    anything else the flexible one. Repeat requests are served by
+    data_fetcher's download caches, which expire with the data.
+    precision='f4' returns the prices as float32.
+    """
+    from data_fetcher import fetch_data, fetch_data_legacy
+    
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}. Use one of: {', '.join(PRECISIONS)}")
+    if start_date and end_date and not period:
+        df = fetch_data_legacy(ticker, start_date, end_date, columns=columns)
+    else:
+        df = fetch_data(ticker, start_date=start_date, end_date=end_date, period=period, interval=interval,
+                        columns=columns)
+    if precision == 'f8':
+        return df
+    return df.astype(PRECISIONS[precision])
+
+def generate_moving_avg_crossover_strat(ticker, start_date=None, end_date=None, short_window=20, long_window=50, period=None, interval="1d", return_arrays=False,
+                                        precision='f8'):
     """
     Generate moving average crossover strategy with flexible time control
     
@@ -11,18 +61,18 @@ def generate_moving_avg_crossover_strat(ticker, start_date=None, end_date=None,
         short_window, long_window: Moving average windows
         period: Period string (1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max)
         interval: Data interval (1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo)
+        return_arrays: Return signals as a dict of arrays aligned with df instead of a DataFrame
+        precision: 'f8', or 'f4' to hold the prices as float32 (indicators are still computed in float64)
     """
-    if start_date and end_date and not period:
-        # Legacy mode - use start/end dates
-        df = fetch_data_legacy(ticker, start_date, end_date)
-    else:
-        # New flexible mode
-        df = fetch_data(ticker, start_date=start_date, end_date=end_date, period=period, interval=interval)
+    from signals import moving_average_signals
     
-    signals = moving_average_signals(df, short_window, long_window)
+    df = _fetch(ticker, start_date, end_date, period, interval, CLOSE_COLUMNS, precision)
+    
+    signals = moving_average_signals(df, short_window, long_window, return_arrays)
     return df, signals
 
-def generate_mean_reversal_strat(ticker, start_date=None, end_date=None, window=20, threshold=1.0, period=None, interval="1d"):
+def generate_mean_reversal_strat(ticker, start_date=None, end_date=None, window=20, threshold=1.0, period=None, interval="1d", return_arrays=False,
+                                 precision='f8'):
     """
     Generate mean reversion strategy with flexible time control
     
@@ -33,17 +83,42 @@ def generate_mean_reversal_strat(ticker, start_date=None, end_date=None, window=
         threshold: Z-score threshold
         period: Period string (1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max)
         interval: Data interval (1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo)
+        return_arrays: Return signals as a dict of arrays aligned with df instead of a DataFrame
+        precision: 'f8', or 'f4' to hold the prices as float32 (indicators are still computed in float64)
     """
-    if start_date and end_date and not period:
-        # Legacy mode - use start/end dates
-        df = fetch_data_legacy(ticker, start_date, end_date)
-    else:
-        # New flexible mode
-        df = fetch_data(ticker, start_date=start_date, end_date=end_date, period=period, interval=interval)
+    from signals import mean_reversion_signals
+    
+    df = _fetch(ticker, start_date, end_date, period, interval, CLOSE_COLUMNS, precision)
     
-    signals = mean_reversion_signals(df, window, threshold)
+    signals = mean_reversion_signals(df, window, threshold, return_arrays)
     return df, signals
 
+def generate_mean_reversal_batch(tickers, start_date=None, end_date=None, window=20, threshold=1.0, period=None, interval="1d",
+                                 precision='f8'):
+    """
+    Generate the mean reversion strategy for several tickers at once
+    
+    Same arguments as generate_mean_reversal_strat, with a list of tickers.
+    Each ticker is fetched (and cached) as usual; the signals are computed in
+    one vectorized pass over all closes. Returns ({ticker: df}, {ticker: signals}),
+    ready for backtest_many.
+    """
+    import pandas as pd
+    from signals import mean_reversion_signals_batch
+    
+    df_map = {}
+    for ticker in tickers:
+        df_map[ticker] = _fetch(ticker, start_date, end_date, period, interval, CLOSE_COLUMNS, precision)
+    
+    prices = pd.DataFrame({
+        ticker: df['Adj Close' if 'Adj Close' in df.columns else 'Close']
+        for ticker, df in df_map.items()
+    })
+    batch = mean_reversion_signals_batch(prices, window, threshold)
+    # Back onto each ticker's own bars, as backtest_strategy expects
+    signals_map = {ticker: batch[ticker].reindex(df.index) for ticker, df in df_map.items()}
+    return df_map, signals_map
+
 
 
 
@@ -57,20 +132,20 @@ def generate_williamsr_strat(
     long_entry_thresh:  float = -80.0,
     long_exit_thresh:   float = -50.0,
     short_entry_thresh: float = -20.0,
-    short_exit_thresh:  float = -50.0
+    short_exit_thresh:  float = -50.0,
+    return_arrays:      bool  = False,
+    precision:          str   = 'f8'
 ):
     """
     Returns price df and signals with explicit buy/sell/short/cover flags.
+    With return_arrays, signals is a dict of arrays aligned with df instead;
+    precision='f4' holds the prices as float32 (indicators stay float64).
     """
+    import numpy as np
+    from signals import williamsr_signals
+
     # 1) fetch data
-    if start_date and end_date and not period:
-        df = fetch_data_legacy(ticker, start_date, end_date)
-    else:
-        df = fetch_data(ticker,
-                        start_date=start_date,
-                        end_date=end_date,
-                        period=period,
-                        interval=interval)
+    df = _fetch(ticker, start_date, end_date, period, interval, HLC_COLUMNS, precision)
 
     # 2) compute %R + stateful signal
     signals = williamsr_signals(
@@ -79,18 +154,27 @@ def generate_williamsr_strat(
         long_entry_thresh=long_entry_thresh,
         long_exit_thresh= long_exit_thresh,
         short_entry_thresh=short_entry_thresh,
-        short_exit_thresh= short_exit_thresh
+        short_exit_thresh= short_exit_thresh,
+        return_arrays=return_arrays
     )
 
-    # 3) explicit event flags
-    pos   = signals['positions']
-    sig   = signals['signal']
-    prev  = sig.shift(1).fillna(0.0)
+    # 3) explicit event flags, on the raw arrays
+    pos   = np.asarray(signals['positions'])
+    sig   = np.asarray(signals['signal'])
+    prev  = np.empty_like(sig)
+    prev[:1] = 0
+    prev[1:] = sig[:-1]
 
-    signals['long_entry']   = (pos ==  1.0) & (sig ==  1.0)
-    signals['long_exit']    = (pos == -1.0) & (prev == 1.0)
-    signals['short_entry']  = (pos == -1.0) & (sig == -1.0)
-    signals['short_exit']   = (pos ==  1.0) & (prev == -1.0)
+    flags = {
+        'long_entry':  (pos ==  1) & (sig ==  1),
+        'long_exit':   (pos == -1) & (prev ==  1),
+        'short_entry': (pos == -1) & (sig == -1),
+        'short_exit':  (pos ==  1) & (prev == -1),
+    }
+    if return_arrays:
+        signals.update(flags)
+    else:
+        signals[list(flags)] = np.column_stack(tuple(flags.values()))
 
     return df, signals
 
@@ -102,7 +186,9 @@ def generate_rsi_strat(
     interval="1d",
     rsi_period=14,
     buy_threshold=30,
-    sell_threshold=70
+    sell_threshold=70,
+    return_arrays=False,
+    precision='f8'
 ):
     """
     Generate pure RSI strategy
@@ -115,13 +201,14 @@ def generate_rsi_strat(
         rsi_period: RSI calculation period
         buy_threshold: Buy when RSI <= this value (oversold)
         sell_threshold: Sell when RSI >= this value (overbought)
+        return_arrays: Return signals as a dict of arrays aligned with df instead of a DataFrame
+        precision: 'f8', or 'f4' to hold the prices as float32 (indicators are still computed in float64)
     """
-    if start_date and end_date and not period:
-        df = fetch_data_legacy(ticker, start_date, end_date)
-    else:
-        df = fetch_data(ticker, start_date=start_date, end_date=end_date, period=period, interval=interval)
+    from signals import rsi_signals
+    
+    df = _fetch(ticker, start_date, end_date, period, interval, CLOSE_COLUMNS, precision)
     
-    signals = rsi_signals(df, rsi_period, buy_threshold, sell_threshold)
+    signals = rsi_signals(df, rsi_period, buy_threshold, sell_threshold, return_arrays)
     return df, signals
 
 def generate_matei_strat(
@@ -138,7 +225,9 @@ def generate_matei_strat(
     wr_buy_th=-85,
     wr_sell_th=-15,
     vol_buy_th=0.007,
-    vol_sell_th=0.000
+    vol_sell_th=0.000,
+    return_arrays=False,
+    precision='f8'
 ):
     """
     Generate Matei's triple indicator strategy with RSI, Williams %R, and volatility filters
@@ -157,12 +246,13 @@ def generate_matei_strat(
         wr_sell_th: Williams %R sell threshold
         vol_buy_th: Volatility buy threshold
         vol_sell_th: Volatility sell threshold
+        return_arrays: Return signals as a dict of arrays aligned with df instead of a DataFrame
+        precision: 'f8', or 'f4' to hold the prices as float32 (indicators are still computed in float64)
     """
+    from signals import matei_signals
+    
     # Fetch data using existing infrastructure
-    if start_date and end_date and not period:
-        df = fetch_data_legacy(ticker, start_date, end_date)
-    else:
-        df = fetch_data(ticker, start_date=start_date, end_date=end_date, period=period, interval=interval)
+    df = _fetch(ticker, start_date, end_date, period, interval, HLC_COLUMNS, precision)
     
     # Generate signals using the Matei strategy
     signals = matei_signals(
@@ -175,7 +265,116 @@ def generate_matei_strat(
         wr_buy_th=wr_buy_th,
         wr_sell_th=wr_sell_th,
         vol_buy_th=vol_buy_th,
-        vol_sell_th=vol_sell_th
+        vol_sell_th=vol_sell_th,
+        return_arrays=return_arrays
+    )
+    
+    return df, signals
+
+async def run_strategies_async(specs, max_workers=None):
+    """
+    Run several strategy generators concurrently.
+    
+    specs is a list of (generator, kwargs) pairs, e.g.
+    (generate_rsi_strat, dict(ticker='AAPL', period='60d', interval='5m')).
+    Each generator runs in a worker process, so the downloads overlap and the
+    signal computations run in parallel; yfinance keeps per-download state in
+    module globals, which rules out threads. Workers mostly wait on the
+    network, so by default there is one per spec rather than one per core,
+    up to MAX_STRATEGY_WORKERS. Returns [(df, signals)] in specs order.
+    """
+    loop = asyncio.get_running_loop()
+    if max_workers is None:
+        max_workers = max(min(len(specs), MAX_STRATEGY_WORKERS), 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return await asyncio.gather(*(
+            loop.run_in_executor(pool, partial(generator, **kwargs))
+            for generator, kwargs in specs
+        ))
+
+def run_strategies(specs, max_workers=None):
+    """Blocking wrapper around run_strategies_async"""
+    return asyncio.run(run_strategies_async(specs, max_workers))
+
+# Price frame of the running grid search, rebuilt in each worker process over
+# the shared memory block by _attach_grid, and the Matei indicators computed
+# on it so far, by (rsi_period, wr_period, vol_lookback)
+_grid_shm = None
+_grid_df = None
+_grid_matei_indicators = {}
+
+def _attach_grid(shm_name, columns, n, tz):
+    """Worker initializer: view the shared price block as this process's frame"""
+    global _grid_shm, _grid_df, _grid_matei_indicators
+    import numpy as np
+    import pandas as pd
+    
+    _grid_shm = shared_memory.SharedMemory(name=shm_name)
+    # One row per column, the bar timestamps (int64 ns) last
+    block = np.ndarray((len(columns) + 1, n), dtype=np.float64, buffer=_grid_shm.buf)
+    block.flags.writeable = False
+    index = pd.DatetimeIndex(block[-1].view(np.int64).view('M8[ns]'), name='Date')
+    if tz is not None:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    _grid_df = pd.DataFrame(dict(zip(columns, block[:-1])), index=index, copy=False)
+    _grid_matei_indicators = {}
+
+def _grid_eval(signal_func, params, initial_capital, kwargs):
+    """Backtest one parameter set on the shared frame; returns its summary row"""
+    from backtest import backtest_strategy, calculate_performance_metrics
+    from signals import matei_signals, matei_indicators
+    
+    extra = {}
+    if signal_func is matei_signals:
+        # The read-only frame never changes, so parameter sets that differ only
+        # in their thresholds share one indicator pass
+        windows = {k: params[k] for k in ('rsi_period', 'wr_period', 'vol_lookback') if k in params}
+        key = tuple(sorted(windows.items()))
+        if key not in _grid_matei_indicators:
+            _grid_matei_indicators[key] = matei_indicators(_grid_df, **windows)
+        extra['indicators'] = _grid_matei_indicators[key]
+    
+    portfolio, _ = backtest_strategy(
+        _grid_df, signal_func(_grid_df, return_arrays=True, **extra, **params), initial_capital,
+        log_transactions=False, **kwargs
     )
+    total = portfolio['total'].to_numpy()
+    return {**params, 'Final_Value': total[-1], **calculate_performance_metrics(total)}
+
+def run_grid(ticker, signal_func, grid, start_date=None, end_date=None, period=None, interval="1d",
+             initial_capital=10000.0, max_workers=None, **kwargs):
+    """
+    Grid search one ticker: backtest signal_func under every parameter set in
+    grid, in parallel worker processes.
+    
+    signal_func is a signal generator from signals.py (e.g. matei_signals)
+    and grid a list of keyword dicts for it. The data is fetched once and its
+    price columns placed in shared memory, which every worker maps instead of
+    receiving a pickled copy of the frame; only a summary row per parameter
+    set comes back. Extra keyword arguments are passed through to
+    backtest_strategy (transactions are never logged). Returns a DataFrame
+    with one row per parameter set, in grid order: the parameters,
+    Final_Value, CAGR, Sharpe_Ratio and Max_Drawdown.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    df = _fetch(ticker, start_date, end_date, period, interval, HLC_COLUMNS)
+    columns = list(df.columns)
+    n = len(df)
     
-    return df, signals
\ No newline at end of file
+    shm = shared_memory.SharedMemory(create=True, size=max((len(columns) + 1) * n * 8, 1))
+    try:
+        block = np.ndarray((len(columns) + 1, n), dtype=np.float64, buffer=shm.buf)
+        block[:-1] = df.to_numpy(dtype=np.float64).T
+        block[-1].view(np.int64)[:] = df.index.as_unit('ns').asi8
+        del block
+        
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_grid,
+                                 initargs=(shm.name, columns, n, df.index.tz)) as pool:
+            rows = list(pool.map(partial(_grid_eval, signal_func, initial_capital=initial_capital,
+                                         kwargs=kwargs), grid))
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import signals
+
+
+def make_prices(n=1500, seed=0):
+    """
+    Synthetic 5-minute OHLCV bars over regular sessions, with two flat
+    stretches (zero range, zero std) longer than the test windows
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2024-01-02', periods=n // 78 + 2, tz='America/New_York')
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=78, freq='5min')
+        for day in days
+    ])[:n], name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.002, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.002, n)))
+    for start in (300, 900):
+        if start >= n:
+            break
+        close[start:start + 40] = close[start - 1]
+        high[start:start + 40] = close[start - 1]
+        low[start:start + 40] = close[start - 1]
+    return pd.DataFrame({'Open': close, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': rng.integers(1000, 5000, n).astype(float)}, index=index)
+
+
+@pytest.fixture
+def prices():
+    return make_prices()
+
+
+@pytest.fixture(params=['default', 'no_bottleneck', 'no_numba'])
+def backend(request, monkeypatch):
+    """
+    Run a test on each indicator code path: bottleneck and the compiled
+    kernels, the sliding-window fallbacks, and the pure numpy/pandas ones.
+    (NUMBA_DISABLE_JIT=1 additionally runs the kernels as plain Python.)
+    """
+    if request.param == 'no_bottleneck':
+        monkeypatch.setattr(signals, 'bn', None)
+    elif request.param == 'no_numba':
+        monkeypatch.setattr(signals, 'NUMBA_AVAILABLE', False)
+    return request.param
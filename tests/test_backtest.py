@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+import backtest
+import baseline
+import signals
+
+CONFIGS = {
+    'stop_loss_take_profit': dict(stop_loss_pct=0.02, take_profit_pct=0.05, dedup_window_minutes=30),
+    'tight_stop_loss': dict(stop_loss_pct=0.005, dedup_window_minutes=0),
+    'tight_take_profit': dict(take_profit_pct=0.005, dedup_window_minutes=10),
+    'trailing_stop': dict(use_trailing_stop=True, trailing_stop_pct=0.01, dedup_window_minutes=5),
+    'take_profit_trailing_stop': dict(take_profit_pct=0.01, use_trailing_stop=True, trailing_stop_pct=0.005),
+    'long_only_no_spread': dict(enable_shorting=False, dedup_window_minutes=0, spread_pct=0.0),
+}
+
+
+@pytest.fixture
+def bars(prices):
+    # The baseline loop is slow; a shorter history still hits every exit path
+    return prices.iloc[:800]
+
+
+@pytest.fixture(params=['williamsr', 'mean_reversion'])
+def trade_signals(request, bars):
+    if request.param == 'williamsr':
+        return signals.williamsr_signals(bars, 24, -80, -20, -20, -80)
+    return signals.mean_reversion_signals(bars, 20, 1.5)
+
+
+@pytest.mark.parametrize('log_transactions', [True, False])
+@pytest.mark.parametrize('config', CONFIGS.values(), ids=CONFIGS.keys())
+def test_backtest_matches_baseline(bars, trade_signals, config, log_transactions, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    expected_portfolio, expected_transactions = baseline.backtest_strategy(
+        bars, trade_signals, log_transactions=log_transactions, **config)
+    expected_log = (tmp_path / 'transactions.txt').read_text() if log_transactions else None
+
+    portfolio, transactions = backtest.backtest_strategy(
+        bars, trade_signals, log_transactions=log_transactions, **config)
+
+    pd.testing.assert_frame_equal(portfolio, expected_portfolio, check_exact=False, rtol=1e-9)
+    expected_transactions = pd.DataFrame(expected_transactions, columns=transactions.columns)
+    assert transactions['Action'].astype(str).tolist() == expected_transactions['Action'].tolist()
+    pd.testing.assert_frame_equal(transactions.drop(columns='Action'), expected_transactions.drop(columns='Action'),
+                                  check_dtype=False, check_exact=False, rtol=1e-9)
+    if log_transactions:
+        assert (tmp_path / 'transactions.txt').read_text() == expected_log
+
+
+def test_backtest_covers_risk_exits(bars, trade_signals, tmp_path, monkeypatch):
+    """The configurations above exercise every kind of risk-management exit"""
+    monkeypatch.chdir(tmp_path)
+    actions = set()
+    for config in CONFIGS.values():
+        _, transactions = backtest.backtest_strategy(bars, trade_signals, **config)
+        actions.update(transactions['Action'].astype(str))
+    for exit_reason in ('STOP_LOSS', 'TAKE_PROFIT', 'TRAILING_STOP'):
+        assert {f'{exit_reason}_LONG', f'{exit_reason}_SHORT'} <= actions
+
+
+def test_backtest_accepts_signal_arrays(prices, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = CONFIGS['stop_loss_take_profit']
+    frame_portfolio, frame_transactions = backtest.backtest_strategy(
+        prices, signals.matei_signals(prices, 20, 20, 20, 30, 70, -80, -20), **config)
+    array_portfolio, array_transactions = backtest.backtest_strategy(
+        prices, signals.matei_signals(prices, 20, 20, 20, 30, 70, -80, -20, return_arrays=True), **config)
+
+    pd.testing.assert_frame_equal(array_portfolio, frame_portfolio)
+    pd.testing.assert_frame_equal(array_transactions, frame_transactions)
+
+
+def test_backtest_many_matches_serial_without_log_file(tmp_path, monkeypatch):
+    from conftest import make_prices
+    monkeypatch.chdir(tmp_path)
+    df_map = {f'T{seed}': make_prices(seed=seed) for seed in range(3)}
+    signals_map = {ticker: signals.williamsr_signals(df, 24, -80, -20, -20, -80) for ticker, df in df_map.items()}
+    config = CONFIGS['stop_loss_take_profit']
+
+    results = backtest.backtest_many(df_map, signals_map, max_workers=2, **config)
+
+    assert not (tmp_path / 'transactions.txt').exists()
+    for ticker, df in df_map.items():
+        portfolio, transactions = backtest.backtest_strategy(df, signals_map[ticker], log_path=None, **config)
+        assert len(transactions)
+        pd.testing.assert_frame_equal(results[ticker][0], portfolio)
+        pd.testing.assert_frame_equal(results[ticker][1], transactions)
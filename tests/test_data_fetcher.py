@@ -0,0 +1,96 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import data_fetcher
+from conftest import make_prices
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """data_fetcher's time.time(), advanced by hand"""
+    clock = SimpleNamespace(now=time.time())
+    monkeypatch.setattr(data_fetcher, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def downloads(monkeypatch, tmp_path, clock):
+    """
+    Fake yf.download in an empty working directory (so an empty disk cache)
+    with an empty memo; returns the list of downloaded tickers, and each
+    download's prices differ from the previous one's
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_fetcher, '_download_memo', {})
+    calls = []
+
+    def download(ticker, **kwargs):
+        calls.append(ticker)
+        df = make_prices(200, seed=len(calls))
+        df.columns = pd.MultiIndex.from_product([df.columns, [ticker]])
+        return df
+    monkeypatch.setattr(data_fetcher.yf, 'download', download)
+    return calls
+
+
+def fetch(**kwargs):
+    return data_fetcher.fetch_data('TEST', period='60d', interval='5m', progress=False, **kwargs)
+
+
+def test_repeat_request_is_not_downloaded_again(downloads, clock):
+    first = fetch()
+    cache_path = data_fetcher._cache_path('TEST', '60d', '5m', None, None)
+    written = os.path.getmtime(cache_path)
+
+    # From the memo, then (in a fresh process) from the disk cache
+    clock.now += data_fetcher.CACHE_TTL_INTRADAY / 2
+    pd.testing.assert_frame_equal(fetch(), first)
+    data_fetcher._download_memo.clear()
+    pd.testing.assert_frame_equal(fetch(), first)
+
+    assert downloads == ['TEST']
+    # Neither cache hit rewrote the pickle
+    assert os.path.getmtime(cache_path) == written
+
+
+def test_expired_request_is_downloaded_again(downloads, clock):
+    first = fetch()
+    clock.now += data_fetcher.CACHE_TTL_INTRADAY + 1
+    second = fetch()
+
+    assert downloads == ['TEST', 'TEST']
+    assert not second.equals(first)
+    # The new download replaced the old one in the memo and in the pickle
+    pd.testing.assert_frame_equal(fetch(), second)
+    assert downloads == ['TEST', 'TEST']
+    cached = pd.read_pickle(data_fetcher._cache_path('TEST', '60d', '5m', None, None))
+    pd.testing.assert_frame_equal(cached.droplevel(1, axis=1), second)
+
+
+def test_use_cache_false_always_downloads(downloads):
+    fetch(use_cache=False)
+    fetch(use_cache=False)
+    assert downloads == ['TEST', 'TEST']
+    assert not os.path.exists(data_fetcher.CACHE_DIR)
+
+
+def test_columns_filter(downloads):
+    df = fetch(columns=('High', 'Low', 'Close', 'Adj Close'))
+    assert list(df.columns) == ['High', 'Low', 'Close']
+    assert list(fetch().columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert downloads == ['TEST']
+
+
+def test_changing_a_result_leaves_the_cache_intact(downloads):
+    expected = fetch()
+    df = fetch()
+    df.iloc[:, :] = 0.0
+    df.columns = ['a', 'b', 'c', 'd', 'e']
+    df.index.name = 'changed'
+
+    pd.testing.assert_frame_equal(fetch(), expected)
+    assert downloads == ['TEST']
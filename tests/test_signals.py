@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+import signals
+
+MATEI_PARAMS = [
+    dict(rsi_period=20, wr_period=20, vol_lookback=20, rsi_buy_th=30, rsi_sell_th=70,
+         wr_buy_th=-80, wr_sell_th=-20, vol_buy_th=0.007, vol_sell_th=0.0),
+    dict(rsi_period=72, wr_period=72, vol_lookback=72),
+]
+
+
+def assert_same_signals(result, expected, columns):
+    """Same signal and (first bar aside) positions; indicator columns within float tolerance"""
+    np.testing.assert_array_equal(np.asarray(result['signal'], dtype=np.float64), expected['signal'])
+    positions = np.asarray(result['positions'], dtype=np.float64)
+    assert positions[0] == 0
+    np.testing.assert_array_equal(positions[1:], expected['positions'].to_numpy()[1:])
+    for column in columns:
+        np.testing.assert_allclose(result[column], expected[column], rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize('short_window, long_window', [(5, 20), (20, 50)])
+def test_moving_average_matches_baseline(prices, backend, short_window, long_window):
+    result = signals.moving_average_signals(prices, short_window, long_window)
+    expected = baseline.moving_average_signals(prices, short_window, long_window)
+    assert_same_signals(result, expected, ['short_mavg', 'long_mavg'])
+
+
+@pytest.mark.parametrize('window, threshold', [(20, 1.0), (30, 2.0)])
+def test_mean_reversion_matches_baseline(prices, backend, window, threshold):
+    result = signals.mean_reversion_signals(prices, window, threshold)
+    expected = baseline.mean_reversion_signals(prices, window, threshold)
+    assert_same_signals(result, expected, [])
+
+    # pandas' running sums carry rounding residue out of a flat stretch: it
+    # gives flat windows a tiny std (z-score 0 instead of NaN, both meaning no
+    # signal) and the windows just after them z-scores off by ~1e-5
+    rolling = prices['Close'].rolling(window, min_periods=1)
+    varying = (rolling.max() != rolling.min()).to_numpy()
+    np.testing.assert_allclose(result['zscore'][varying], expected['zscore'][varying], atol=1e-5)
+
+
+def test_flat_windows_have_no_zscore(prices, backend):
+    # The flat stretch at bars 300-339 is longer than the window
+    zscore = signals.mean_reversion_signals(prices, 20, 1.0)['zscore'].to_numpy()
+    assert np.isnan(zscore[319:340]).all()
+
+
+def test_mean_reversion_batch_matches_single(backend):
+    from conftest import make_prices
+    closes = pd.DataFrame({f'T{seed}': make_prices(seed=seed)['Close'] for seed in range(3)})
+    batch = signals.mean_reversion_signals_batch(closes, 20, 1.0)
+    for ticker in closes:
+        single = signals.mean_reversion_signals(closes[[ticker]].rename(columns={ticker: 'Close'}), 20, 1.0)
+        pd.testing.assert_frame_equal(batch[ticker], single)
+
+
+def test_williamsr_matches_baseline(prices, backend):
+    result = signals.williamsr_signals(prices, 24, -80, -20, -20, -80)
+    expected = baseline.williamsr_signals(prices, 24, -80, -20, -20, -80)
+    assert_same_signals(result, expected, ['wr'])
+
+
+@pytest.mark.parametrize('period', [14, 72])
+def test_rsi_matches_baseline(prices, backend, period):
+    result = signals.rsi_signals(prices, period, 30, 70)
+    expected = baseline.rsi_signals(prices, period, 30, 70)
+    assert_same_signals(result, expected, ['rsi'])
+
+
+@pytest.mark.parametrize('params', MATEI_PARAMS)
+def test_matei_matches_baseline(prices, backend, params):
+    result = signals.matei_signals(prices, **params)
+    expected = baseline.matei_signals(prices, **params)
+    assert_same_signals(result, expected, ['rsi', 'wr', 'vol'])
+
+
+@pytest.mark.parametrize('params', MATEI_PARAMS)
+@pytest.mark.parametrize('warmup', [0, 1, 150])
+def test_step_matei_matches_matei_signals(prices, backend, params, warmup):
+    expected = signals.matei_signals(prices, **params)
+
+    state = signals.init_matei_state(prices.iloc[:warmup], **params)
+    steps = [signals.step_matei(state, high, low, close) for high, low, close in
+             prices[['High', 'Low', 'Close']].iloc[warmup:].itertuples(index=False)]
+
+    np.testing.assert_array_equal([signal for signal, _ in steps], expected['signal'].iloc[warmup:])
+    np.testing.assert_array_equal([change for _, change in steps], expected['positions'].iloc[warmup:])
+
+
+@pytest.mark.parametrize('window, min_count', [(1, 1), (2, 1), (5, 3), (20, 1), (500, 1)])
+@pytest.mark.parametrize('with_nan', [False, True])
+def test_flat_windows_match_rolling_max_min(backend, window, min_count, with_nan):
+    rng = np.random.default_rng(window)
+    # A step series: flat runs of 20 bars on average, some much longer
+    values = (rng.random((400, 3)) < 0.05).cumsum(axis=0).astype(np.float64)
+    if with_nan:
+        values[rng.integers(0, 400, 20), rng.integers(0, 3, 20)] = np.nan
+    rolling = pd.DataFrame(values).rolling(window, min_periods=min_count)
+    expected = (rolling.max() == rolling.min()).to_numpy()
+
+    flat, _ = signals._flat_windows(values, window, min_count)
+    np.testing.assert_array_equal(flat, expected)
+    flat, _ = signals._flat_windows(values[:, 0].copy(), window, min_count)
+    np.testing.assert_array_equal(flat, expected[:, 0])
+
+
+@pytest.mark.parametrize('period', [1, 2, 14, 72])
+def test_vectorized_rsi_matches_kernel(prices, backend, period):
+    close = prices['Close'].to_numpy()
+    with_gaps = close.copy()
+    with_gaps[500:520] = np.nan
+    for price in (close, with_gaps, close[:1], close[:period]):
+        np.testing.assert_allclose(signals._rsi_vectorized(price, period), signals._rsi(price, period),
+                                   rtol=1e-9, atol=1e-9)
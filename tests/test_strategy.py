@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_fetcher
+import strategy
+from conftest import make_prices
+
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    """Serve make_prices() frames from fetch_data instead of downloading"""
+    def fetch_data(ticker, columns=None, **kwargs):
+        df = make_prices(seed=sum(map(ord, ticker)))
+        return df[[c for c in columns if c in df.columns]]
+    monkeypatch.setattr(data_fetcher, 'fetch_data', fetch_data)
+
+
+@pytest.mark.parametrize('generate, params', [
+    (strategy.generate_moving_avg_crossover_strat, dict(short_window=5, long_window=20)),
+    (strategy.generate_mean_reversal_strat, dict(window=20, threshold=1.0)),
+    (strategy.generate_williamsr_strat, dict(wr_period=24)),
+    (strategy.generate_rsi_strat, dict(rsi_period=14)),
+    (strategy.generate_matei_strat, dict(rsi_period=20, wr_period=20, vol_lookback=20, rsi_buy_th=30,
+                                         rsi_sell_th=70, wr_buy_th=-80, wr_sell_th=-20)),
+])
+def test_float32_precision_keeps_signals(fake_fetch, backend, generate, params):
+    df64, signals64 = generate('TEST', period='60d', interval='5m', **params)
+    df32, signals32 = generate('TEST', period='60d', interval='5m', precision='f4', **params)
+
+    assert (df32.dtypes == np.float32).all()
+    np.testing.assert_array_equal(signals32['signal'], signals64['signal'])
+    np.testing.assert_array_equal(signals32['positions'], signals64['positions'])
+
+
+def test_float32_precision_keeps_batch_signals(fake_fetch, backend):
+    tickers = ['AAA', 'BBB', 'CCC']
+    _, signals64 = strategy.generate_mean_reversal_batch(tickers, period='60d', interval='5m')
+    _, signals32 = strategy.generate_mean_reversal_batch(tickers, period='60d', interval='5m', precision='f4')
+
+    for ticker in tickers:
+        np.testing.assert_array_equal(signals32[ticker]['signal'], signals64[ticker]['signal'])
+
+
+def test_unknown_precision(fake_fetch):
+    with pytest.raises(ValueError):
+        strategy.generate_rsi_strat('TEST', period='60d', precision='f2')
+
+
+@pytest.mark.parametrize('signal_func, grid', [
+    ('matei_signals', [dict(rsi_period=20, wr_period=20, vol_lookback=20, rsi_buy_th=30, rsi_sell_th=70,
+                            wr_buy_th=-80, wr_sell_th=-20),
+                       dict(rsi_period=20, wr_period=20, vol_lookback=20, rsi_buy_th=40, rsi_sell_th=60,
+                            wr_buy_th=-70, wr_sell_th=-30),
+                       dict(rsi_period=72, wr_period=72, vol_lookback=72)]),
+    ('mean_reversion_signals', [dict(window=20, threshold=1.0), dict(window=30, threshold=2.0)]),
+])
+def test_run_grid_matches_serial_backtests(fake_fetch, backend, signal_func, grid):
+    import signals
+    from backtest import backtest_strategy, calculate_performance_metrics
+
+    signal_func = getattr(signals, signal_func)
+    risk = dict(stop_loss_pct=0.02, take_profit_pct=0.05, dedup_window_minutes=10)
+    result = strategy.run_grid('TEST', signal_func, grid, period='60d', interval='5m', max_workers=2, **risk)
+
+    df = strategy._fetch('TEST', None, None, '60d', '5m', strategy.HLC_COLUMNS)
+    for row, params in zip(result.to_dict('records'), grid):
+        portfolio, _ = backtest_strategy(df, signal_func(df, **params), log_transactions=False, **risk)
+        total = portfolio['total'].to_numpy()
+        expected = {**params, 'Final_Value': total[-1], **calculate_performance_metrics(total)}
+        # Columns of parameters other sets use are NaN in this row
+        assert {key: row[key] for key in expected} == expected
+
+
+def test_run_strategies_matches_serial_generators(fake_fetch, monkeypatch):
+    pool_sizes = []
+    executor = strategy.ProcessPoolExecutor
+
+    def recording_executor(max_workers=None, **kwargs):
+        pool_sizes.append(max_workers)
+        return executor(max_workers=max_workers, **kwargs)
+    monkeypatch.setattr(strategy, 'ProcessPoolExecutor', recording_executor)
+    monkeypatch.setattr(strategy, 'MAX_STRATEGY_WORKERS', 2)
+
+    specs = [
+        (strategy.generate_rsi_strat, dict(ticker='AAA', period='60d', interval='5m')),
+        (strategy.generate_mean_reversal_strat, dict(ticker='BBB', period='60d', interval='5m')),
+        (strategy.generate_matei_strat, dict(ticker='CCC', period='60d', rsi_period=20, wr_period=20,
+                                             vol_lookback=20)),
+    ]
+    results = strategy.run_strategies(specs)
+
+    assert pool_sizes == [2]
+    assert len(results) == len(specs)
+    for (df, signals), (generator, kwargs) in zip(results, specs):
+        expected_df, expected_signals = generator(**kwargs)
+        pd.testing.assert_frame_equal(df, expected_df)
+        pd.testing.assert_frame_equal(signals, expected_signals)